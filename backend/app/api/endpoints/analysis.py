@@ -116,7 +116,7 @@ async def execute_analysis(
             name=f"数据分析: {config.algorithm}",
             task_type="analysis",
             status="completed",
-            parameters=config.dict(),
+            parameters=config.model_dump(),
             result=results
         )
         
@@ -1,11 +1,14 @@
 """执行历史管理API端点"""
 
 from typing import List
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.storage import ExecutionStorage, JSONStorage
+from app.core.storage import ExecutionStorage, JSONStorage, list_json_files
 from app.core.config import settings
+from app.database import get_db
+import msgspec
 import os
 
 router = APIRouter()
@@ -25,10 +28,39 @@ class ExecutionResponse(BaseModel):
     created_at: str
 
 
+@router.get("/project/{project_id}", response_model=dict)
+async def list_project_executions(
+    project_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """分页获取项目的执行历史"""
+    try:
+        executions = await ExecutionStorage.list_project_executions(
+            db, project_id, limit=limit, offset=offset
+        )
+        
+        # 摘要为 msgspec 结构体，直接编码为JSON字节返回
+        content = msgspec.json.encode({
+            "executions": executions,
+            "limit": limit,
+            "offset": offset
+        })
+        
+        return Response(content=content, media_type="application/json")
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取执行历史失败: {str(e)}"
+        )
+
+
 @router.get("/{execution_id}", response_model=ExecutionResponse)
-async def get_execution(execution_id: str):
+async def get_execution(execution_id: str, db: AsyncSession = Depends(get_db)):
     """获取执行记录详情"""
-    execution = ExecutionStorage.get_execution(execution_id)
+    execution = await ExecutionStorage.get_execution(db, execution_id)
     
     if not execution:
         raise HTTPException(
@@ -40,10 +72,10 @@ async def get_execution(execution_id: str):
 
 
 @router.get("/{execution_id}/steps", response_model=dict)
-async def get_execution_steps(execution_id: str):
+async def get_execution_steps(execution_id: str, db: AsyncSession = Depends(get_db)):
     """获取执行步骤列表"""
     # 检查执行记录是否存在
-    execution = ExecutionStorage.get_execution(execution_id)
+    execution = await ExecutionStorage.get_execution(db, execution_id)
     if not execution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,13 +87,14 @@ async def get_execution_steps(execution_id: str):
         steps_dir = os.path.join(settings.EXECUTIONS_DIR, "steps", execution_id)
         
         if os.path.exists(steps_dir):
-            for file_name in os.listdir(steps_dir):
-                if file_name.endswith(".json"):
-                    step_file = os.path.join(steps_dir, file_name)
-                    step_data = JSONStorage.load_json(step_file)
-                    
-                    if step_data:
-                        steps.append(step_data)
+            step_files = list_json_files(steps_dir)
+            
+            # 并发读取所有步骤文件
+            steps = [
+                step_data
+                for step_data in await JSONStorage.abulk_load(step_files)
+                if step_data
+            ]
         
         # 按步骤顺序排序
         steps.sort(key=lambda x: x.get("step_order", 0))
@@ -76,10 +109,10 @@ async def get_execution_steps(execution_id: str):
 
 
 @router.delete("/{execution_id}", response_model=dict)
-async def delete_execution(execution_id: str):
+async def delete_execution(execution_id: str, db: AsyncSession = Depends(get_db)):
     """删除执行记录"""
     # 检查执行记录是否存在
-    execution = ExecutionStorage.get_execution(execution_id)
+    execution = await ExecutionStorage.get_execution(db, execution_id)
     if not execution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,7 +120,7 @@ async def delete_execution(execution_id: str):
         )
     
     try:
-        success = ExecutionStorage.delete_execution(execution_id)
+        success = await ExecutionStorage.delete_execution(db, execution_id)
         
         if success:
             # 删除相关的步骤文件
@@ -3,8 +3,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime
+import hashlib
 import uuid
 import os
 import aiofiles
@@ -18,6 +20,9 @@ from pydantic import BaseModel
 
 router = APIRouter()
 
+# 上传文件分块读写大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class FileResponse(BaseModel):
     id: str
@@ -34,6 +39,35 @@ class FileResponse(BaseModel):
     updated_at: datetime
 
 
+async def _find_duplicate(db: AsyncSession, project_id: str, content_sha256: str) -> Optional[UploadedFile]:
+    """查找同一项目内内容相同的已上传文件"""
+    result = await db.execute(
+        select(UploadedFile).where(
+            UploadedFile.project_id == project_id,
+            UploadedFile.content_sha256 == content_sha256
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+def _file_response(uploaded_file: UploadedFile) -> FileResponse:
+    """由文件记录构建响应"""
+    return FileResponse(
+        id=uploaded_file.id,
+        project_id=uploaded_file.project_id,
+        filename=uploaded_file.filename,
+        original_filename=uploaded_file.original_filename,
+        file_path=uploaded_file.file_path,
+        file_size=uploaded_file.file_size,
+        file_type=uploaded_file.file_type,
+        mime_type=uploaded_file.mime_type,
+        status=uploaded_file.status,
+        description=uploaded_file.description,
+        created_at=uploaded_file.created_at,
+        updated_at=uploaded_file.updated_at
+    )
+
+
 @router.post("/upload", response_model=FileResponse)
 async def upload_file(
     project_id: str = Form(...),
@@ -75,10 +109,19 @@ async def upload_file(
     # 确保上传目录存在
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     
-    # 保存文件
+    # 分块保存文件，同时计算内容哈希
+    hasher = hashlib.sha256()
     async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            await f.write(chunk)
+    content_sha256 = hasher.hexdigest()
+    
+    # 同一项目内已存在相同内容的文件时直接返回已有记录
+    existing_file = await _find_duplicate(db, project_id, content_sha256)
+    if existing_file:
+        os.remove(file_path)
+        return _file_response(existing_file)
     
     # 创建文件记录
     uploaded_file = UploadedFile(
@@ -91,11 +134,21 @@ async def upload_file(
         file_type=file_ext.replace('.', ''),
         mime_type=file.content_type,
         status="uploaded",
-        description=description
+        description=description,
+        content_sha256=content_sha256
     )
     
     db.add(uploaded_file)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发上传相同内容时由唯一索引拦截，删除本次写入的文件并返回先提交的记录
+        await db.rollback()
+        os.remove(file_path)
+        existing_file = await _find_duplicate(db, project_id, content_sha256)
+        if existing_file is None:
+            raise
+        return _file_response(existing_file)
     await db.refresh(uploaded_file)
     
     # 创建数据处理任务
@@ -112,20 +165,7 @@ async def upload_file(
         }
     )
     
-    return FileResponse(
-        id=uploaded_file.id,
-        project_id=uploaded_file.project_id,
-        filename=uploaded_file.filename,
-        original_filename=uploaded_file.original_filename,
-        file_path=uploaded_file.file_path,
-        file_size=uploaded_file.file_size,
-        file_type=uploaded_file.file_type,
-        mime_type=uploaded_file.mime_type,
-        status=uploaded_file.status,
-        description=uploaded_file.description,
-        created_at=uploaded_file.created_at,
-        updated_at=uploaded_file.updated_at
-    )
+    return _file_response(uploaded_file)
 
 
 @router.get("/", response_model=List[FileResponse])
@@ -141,7 +141,7 @@ async def export_data(
             name=f"数据导出: {config.format}",
             task_type="export",
             status="completed",
-            parameters=config.dict(),
+            parameters=config.model_dump(),
             result={
                 "file_path": final_path,
                 "file_size": file_size,
@@ -273,7 +273,7 @@ async def transmit_data(
             name=f"数据传输: {config.protocol}",
             task_type="transmission",
             status="completed" if transmission_result["success"] else "failed",
-            parameters=config.dict(),
+            parameters=config.model_dump(),
             result=transmission_result
         )
         
@@ -1,21 +1,42 @@
 """项目管理API端点"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, func
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
+import asyncio
+import os
 import uuid
+import weakref
 
+from app.core.config import settings
+from app.core.storage import WorkflowStorage
+from app.core.time_util import now_iso
 from app.database import get_db
 from app.models.project import Project
 from app.models.execution import Execution
 from app.models.file import UploadedFile
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 router = APIRouter()
 
+# 项目状态取值
+ProjectStatus = Literal["active", "draft", "archived"]
+
+
+# 按项目ID持有的工作区同步锁，无协程引用时自动回收
+_project_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _get_project_lock(project_id: str) -> asyncio.Lock:
+    """获取项目的工作区同步锁"""
+    lock = _project_locks.get(project_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _project_locks[project_id] = lock
+    return lock
+
 
 class ProjectCreate(BaseModel):
     name: str
@@ -29,7 +50,7 @@ class ProjectUpdate(BaseModel):
     description: Optional[str] = None
     workflow_path: Optional[str] = None
     project_metadata: Optional[dict] = None
-    status: Optional[str] = None
+    status: Optional[ProjectStatus] = None
 
 
 class ProjectResponse(BaseModel):
@@ -51,7 +72,7 @@ async def create_project(
     db: AsyncSession = Depends(get_db)
 ):
     """创建新项目"""
-    project_id = str(uuid.uuid4())
+    project_id = uuid.uuid4().hex
     
     project = Project(
         id=project_id,
@@ -80,13 +101,44 @@ async def create_project(
 
 @router.get("/", response_model=List[ProjectResponse])
 async def list_projects(
+    response: Response,
     status: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
     db: AsyncSession = Depends(get_db)
 ):
     """获取项目列表"""
-    query = select(Project)
+    # 按项目分组统计执行次数和文件数量，避免逐个项目查询
+    exec_counts = (
+        select(Execution.project_id, func.count(Execution.id).label("executions_count"))
+        .group_by(Execution.project_id)
+        .subquery()
+    )
+    file_counts = (
+        select(UploadedFile.project_id, func.count(UploadedFile.id).label("files_count"))
+        .group_by(UploadedFile.project_id)
+        .subquery()
+    )
+    
+    # 只查询响应需要的列，跳过 ORM 对象构建
+    query = (
+        select(
+            Project.id,
+            Project.name,
+            Project.description,
+            Project.workflow_path,
+            Project.project_metadata,
+            Project.status,
+            Project.created_at,
+            Project.updated_at,
+            func.coalesce(exec_counts.c.executions_count, 0).label("executions_count"),
+            func.coalesce(file_counts.c.files_count, 0).label("files_count"),
+            # 窗口函数在同一次扫描中得到过滤后的总数，无需额外 COUNT 查询
+            func.count().over().label("full_count")
+        )
+        .outerjoin(exec_counts, exec_counts.c.project_id == Project.id)
+        .outerjoin(file_counts, file_counts.c.project_id == Project.id)
+    )
     
     if status:
         query = query.where(Project.status == status)
@@ -94,37 +146,22 @@ async def list_projects(
     query = query.order_by(Project.created_at.desc()).limit(limit).offset(offset)
     
     result = await db.execute(query)
-    projects = result.scalars().all()
-    
-    # 获取每个项目的统计信息
-    project_responses = []
-    for project in projects:
-        # 统计执行次数
-        exec_result = await db.execute(
-            select(func.count(Execution.id)).where(Execution.project_id == project.id)
-        )
-        executions_count = exec_result.scalar() or 0
-        
-        # 统计文件数量
-        file_result = await db.execute(
-            select(func.count(UploadedFile.id)).where(UploadedFile.project_id == project.id)
-        )
-        files_count = file_result.scalar() or 0
-        
-        project_responses.append(ProjectResponse(
-            id=project.id,
-            name=project.name,
-            description=project.description,
-            workflow_path=project.workflow_path,
-            project_metadata=project.project_metadata,
-            status=project.status,
-            created_at=project.created_at,
-            updated_at=project.updated_at,
-            executions_count=executions_count,
-            files_count=files_count
-        ))
-    
-    return project_responses
+    rows = result.all()
+    
+    # 分页总数通过响应头返回，保持列表响应结构不变
+    if rows:
+        total = rows[0].full_count
+    elif offset >= 1:
+        # 偏移超出末尾时窗口函数没有行可返回，改用相同过滤条件单独计数
+        count_query = select(func.count()).select_from(Project)
+        if status:
+            count_query = count_query.where(Project.status == status)
+        total = (await db.execute(count_query)).scalar_one()
+    else:
+        total = 0
+    response.headers["X-Total-Count"] = str(total)
+    
+    return [ProjectResponse(**row._mapping) for row in rows]
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -133,34 +170,41 @@ async def get_project(
     db: AsyncSession = Depends(get_db)
 ):
     """获取项目详情"""
+    # 执行次数和文件数量用 COUNT 子查询得到，不加载关联集合
+    executions_count = (
+        select(func.count(Execution.id))
+        .where(Execution.project_id == Project.id)
+        .scalar_subquery()
+    )
+    files_count = (
+        select(func.count(UploadedFile.id))
+        .where(UploadedFile.project_id == Project.id)
+        .scalar_subquery()
+    )
     result = await db.execute(
-        select(Project)
-        .options(
-            selectinload(Project.executions),
-            selectinload(Project.files)
+        select(
+            Project.id,
+            Project.name,
+            Project.description,
+            Project.workflow_path,
+            Project.project_metadata,
+            Project.status,
+            Project.created_at,
+            Project.updated_at,
+            executions_count.label("executions_count"),
+            files_count.label("files_count")
         )
         .where(Project.id == project_id)
     )
-    project = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not project:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="项目不存在"
         )
     
-    return ProjectResponse(
-        id=project.id,
-        name=project.name,
-        description=project.description,
-        workflow_path=project.workflow_path,
-        project_metadata=project.project_metadata,
-        status=project.status,
-        created_at=project.created_at,
-        updated_at=project.updated_at,
-        executions_count=len(project.executions),
-        files_count=len(project.files)
-    )
+    return ProjectResponse(**row._mapping)
 
 
 @router.get("/{project_id}/workspace", response_model=dict)
@@ -188,16 +232,11 @@ async def get_project_workspace(
     # 如果项目有关联的工作流文件，加载工作流数据
     if project.workflow_path:
         try:
-            import json
-            import os
-            from app.core.config import settings
-            
-            workflow_file_path = os.path.join(settings.WORKFLOWS_DIR, f"{project.workflow_path}.json")
-            if os.path.exists(workflow_file_path):
-                with open(workflow_file_path, 'r', encoding='utf-8') as f:
-                    workflow_data = json.load(f)
-                    if 'configuration' in workflow_data:
-                        workspace_data = workflow_data['configuration']
+            workflow_file_path = WorkflowStorage.resolve_path(project.workflow_path)
+            if workflow_file_path:
+                workflow_data = WorkflowStorage.read_file_cached(workflow_file_path)
+                if workflow_data and 'configuration' in workflow_data:
+                    workspace_data = workflow_data['configuration']
         except Exception as e:
             # 如果加载失败，使用默认数据
             pass
@@ -219,6 +258,8 @@ async def get_project_workspace(
 
 
 class WorkspaceSyncRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
     workspace_data: dict
     auto_update_status: Optional[bool] = False
 
@@ -239,69 +280,69 @@ async def sync_project_workspace(
             detail="项目不存在"
         )
     
-    try:
-        import json
-        import os
-        from app.core.config import settings
-        
-        # 确保工作流目录存在
-        os.makedirs(settings.WORKFLOWS_DIR, exist_ok=True)
-        
-        # 生成工作流文件名（如果项目还没有关联的工作流文件）
-        if not project.workflow_path:
-            project.workflow_path = f"project_{project_id}_workflow"
-        
-        # 保存工作流数据到文件
-        workflow_file_path = os.path.join(settings.WORKFLOWS_DIR, f"{project.workflow_path}.json")
-        workflow_data = {
-            "id": project.workflow_path,
-            "name": f"{project.name} - 工作流",
-            "description": "项目关联的数据处理工作流",
-            "configuration": sync_request.workspace_data,
-            "status": "active" if sync_request.workspace_data.get("nodes") else "draft",
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        
-        with open(workflow_file_path, 'w', encoding='utf-8') as f:
-            json.dump(workflow_data, f, ensure_ascii=False, indent=2)
-        
-        # 更新项目信息
-        updated_fields = ["workflow_path", "updated_at"]
-        
-        # 如果启用自动状态更新
-        if sync_request.auto_update_status:
-            nodes_count = len(sync_request.workspace_data.get("nodes", []))
-            edges_count = len(sync_request.workspace_data.get("edges", []))
+    # 同一项目的同步串行执行，避免并发写入互相覆盖
+    async with _get_project_lock(project_id):
+        try:
+            # 确保工作流目录存在
+            await asyncio.to_thread(os.makedirs, settings.WORKFLOWS_DIR, exist_ok=True)
             
-            if nodes_count == 0:
-                project.status = "draft"
-            elif nodes_count > 0 and edges_count > 0:
-                project.status = "active"
-            else:
-                project.status = "draft"
+            # 生成工作流文件名（如果项目还没有关联的工作流文件）
+            if not project.workflow_path:
+                project.workflow_path = f"project_{project_id}_workflow"
             
-            updated_fields.append("status")
-        
-        await db.commit()
-        await db.refresh(project)
-        
-        return {
-            "success": True,
-            "updated_fields": updated_fields,
-            "message": "工作区数据同步成功"
-        }
-        
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"同步失败: {str(e)}"
-        )
+            # 保存工作流数据到文件
+            now = now_iso()
+            workflow_data = {
+                "id": project.workflow_path,
+                "name": f"{project.name} - 工作流",
+                "description": "项目关联的数据处理工作流",
+                "configuration": sync_request.workspace_data,
+                "status": "active" if sync_request.workspace_data.get("nodes") else "draft",
+                "created_at": now,
+                "updated_at": now
+            }
+            
+            # 先写临时文件再原子替换，避免写入中断导致文件损坏
+            await asyncio.to_thread(WorkflowStorage.save_workflow, workflow_data)
+            
+            # 更新项目信息
+            updated_fields = ["workflow_path", "updated_at"]
+            
+            # 如果启用自动状态更新
+            if sync_request.auto_update_status:
+                nodes_count = len(sync_request.workspace_data.get("nodes", []))
+                edges_count = len(sync_request.workspace_data.get("edges", []))
+                
+                if nodes_count == 0:
+                    project.status = "draft"
+                elif nodes_count > 0 and edges_count > 0:
+                    project.status = "active"
+                else:
+                    project.status = "draft"
+                
+                updated_fields.append("status")
+            
+            await db.commit()
+            await db.refresh(project)
+            
+            return {
+                "success": True,
+                "updated_fields": updated_fields,
+                "message": "工作区数据同步成功"
+            }
+            
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"同步失败: {str(e)}"
+            )
 
 
 class ProjectStatusUpdate(BaseModel):
-    status: str
+    model_config = ConfigDict(extra="forbid")
+    
+    status: ProjectStatus
     reason: Optional[str] = None
 
 
@@ -312,36 +353,32 @@ async def update_project_status(
     db: AsyncSession = Depends(get_db)
 ):
     """更新项目状态"""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
+    result = await db.execute(select(Project.status).where(Project.id == project_id))
+    old_status = result.scalar_one_or_none()
     
-    if not project:
+    if old_status is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="项目不存在"
         )
     
-    # 验证状态值
-    valid_statuses = ["active", "draft", "archived"]
-    if status_update.status not in valid_statuses:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"无效的状态值。有效值: {', '.join(valid_statuses)}"
-        )
-    
-    old_status = project.status
-    project.status = status_update.status
-    
+    # 单条 UPDATE ... RETURNING 完成更新并取回新的时间戳
+    result = await db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(status=status_update.status)
+        .returning(Project.status, Project.updated_at)
+    )
+    new_status, updated_at = result.one()
     await db.commit()
-    await db.refresh(project)
     
     return {
         "success": True,
         "old_status": old_status,
-        "new_status": project.status,
+        "new_status": new_status,
         "reason": status_update.reason,
-        "updated_at": project.updated_at.isoformat(),
-        "message": f"项目状态已从 {old_status} 更新为 {project.status}"
+        "updated_at": updated_at.isoformat(),
+        "message": f"项目状态已从 {old_status} 更新为 {new_status}"
     }
 
 
@@ -352,7 +389,18 @@ async def update_project(
     db: AsyncSession = Depends(get_db)
 ):
     """更新项目"""
-    result = await db.execute(select(Project).where(Project.id == project_id))
+    update_data = project_data.model_dump(exclude_unset=True)
+    
+    if update_data:
+        # 单条 UPDATE ... RETURNING，避免 SELECT + REFRESH 往返
+        result = await db.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(**update_data)
+            .returning(Project)
+        )
+    else:
+        result = await db.execute(select(Project).where(Project.id == project_id))
     project = result.scalar_one_or_none()
     
     if not project:
@@ -361,13 +409,7 @@ async def update_project(
             detail="项目不存在"
         )
     
-    # 更新字段
-    update_data = project_data.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(project, field, value)
-    
     await db.commit()
-    await db.refresh(project)
     
     return ProjectResponse(
         id=project.id,
@@ -387,16 +429,16 @@ async def delete_project(
     db: AsyncSession = Depends(get_db)
 ):
     """删除项目"""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
+    result = await db.execute(
+        delete(Project).where(Project.id == project_id).returning(Project.id)
+    )
     
-    if not project:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="项目不存在"
         )
     
-    await db.execute(delete(Project).where(Project.id == project_id))
     await db.commit()
     
     return {"message": "项目已删除"}
@@ -408,16 +450,19 @@ async def archive_project(
     db: AsyncSession = Depends(get_db)
 ):
     """归档项目"""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
+    result = await db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(status="archived")
+        .returning(Project.id)
+    )
     
-    if not project:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="项目不存在"
         )
     
-    project.status = "archived"
     await db.commit()
     
     return {"message": "项目已归档"}
@@ -429,16 +474,19 @@ async def restore_project(
     db: AsyncSession = Depends(get_db)
 ):
     """恢复项目"""
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
+    result = await db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(status="active")
+        .returning(Project.id)
+    )
     
-    if not project:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="项目不存在"
         )
     
-    project.status = "active"
     await db.commit()
     
     return {"message": "项目已恢复"}
\ No newline at end of file
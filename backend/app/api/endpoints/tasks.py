@@ -1,6 +1,6 @@
 """任务管理API端点"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
@@ -72,23 +72,46 @@ async def create_task(
     return {"task_id": task_id, "message": "任务已创建"}
 
 
+@router.post("/batch", response_model=dict)
+async def create_tasks(
+    tasks_data: List[TaskCreate]
+):
+    """批量创建任务"""
+    task_ids = await TaskManager.create_tasks(
+        [task_data.model_dump() for task_data in tasks_data]
+    )
+    
+    return {"task_ids": task_ids, "message": f"已创建 {len(task_ids)} 个任务"}
+
+
 @router.get("/", response_model=List[TaskListResponse])
 async def list_tasks(
+    response: Response,
     execution_id: Optional[str] = None,
     status: Optional[str] = None,
     task_type: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    after: Optional[datetime] = None,
+    after_id: Optional[str] = None
 ):
-    """获取任务列表"""
+    """获取任务列表，支持 offset 分页与 after/after_id 游标分页"""
     tasks = await TaskManager.list_tasks(
         execution_id=execution_id,
         status=status,
         task_type=task_type,
         limit=limit,
-        offset=offset
+        offset=offset,
+        after=after,
+        after_id=after_id
     )
     
+    # 返回下一页游标（最后一条任务的创建时间与ID）
+    if tasks:
+        last = tasks[-1]
+        response.headers["X-Next-After"] = last["created_at"].isoformat()
+        response.headers["X-Next-After-Id"] = last["id"]
+    
     return [
         TaskListResponse(**task)
         for task in tasks
@@ -336,20 +336,33 @@ async def clean_data(
         
         # 移除异常值（使用IQR方法）
         if config.remove_outliers and config.numeric_columns:
-            for col in config.numeric_columns:
-                if col in df.columns:
-                    try:
-                        q1 = df[col].quantile(0.25)
-                        q3 = df[col].quantile(0.75)
-                        iqr = q3 - q1
-                        lower_bound = q1 - 1.5 * iqr
-                        upper_bound = q3 + 1.5 * iqr
-                        
-                        df = df.filter(
-                            (pl.col(col) >= lower_bound) & (pl.col(col) <= upper_bound)
-                        )
-                    except:
-                        pass  # 忽略处理失败的列
+            outlier_columns = [
+                col for col in config.numeric_columns
+                if col in df.columns and df.schema[col].is_numeric()
+            ]
+            
+            if outlier_columns:
+                # 一次查询计算所有列的四分位数
+                quantile_exprs = []
+                for col in outlier_columns:
+                    quantile_exprs.append(pl.col(col).quantile(0.25).alias(f"{col}__q1"))
+                    quantile_exprs.append(pl.col(col).quantile(0.75).alias(f"{col}__q3"))
+                quantiles = df.select(quantile_exprs).row(0, named=True)
+                
+                # 合并为单个过滤条件，只遍历一次数据
+                mask = None
+                for col in outlier_columns:
+                    q1 = quantiles[f"{col}__q1"]
+                    q3 = quantiles[f"{col}__q3"]
+                    if q1 is None or q3 is None:
+                        continue  # 忽略全为空值的列
+                    
+                    iqr = q3 - q1
+                    condition = pl.col(col).is_between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+                    mask = condition if mask is None else mask & condition
+                
+                if mask is not None:
+                    df = df.filter(mask)
         
         # 保存清洗后的文件
         cleaned_filename = f"{file_id}_cleaned{file_ext}"
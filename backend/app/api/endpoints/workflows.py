@@ -1,14 +1,19 @@
 """工作流管理API端点"""
 
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.storage import JSONStorage
 from app.core.config import settings
-import os
+from app.core.storage import WorkflowStorage
+from app.core.time_util import now_iso
+from app.database import get_db
+from app.models.task import Task
+import asyncio
+import orjson
 import uuid
-from datetime import datetime
 
 router = APIRouter()
 
@@ -32,28 +37,68 @@ class WorkflowResponse(BaseModel):
     updated_at: str
 
 
-@router.post("/", response_model=dict)
-async def create_workflow(workflow: WorkflowCreate):
+@router.post(
+    "/",
+    response_model=dict,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": WorkflowCreate.model_json_schema()}}
+        }
+    }
+)
+async def create_workflow(request: Request):
     """创建工作流"""
+    # 直接解析原始请求体，避免对大量节点与连线逐个构建模型
+    body = await request.body()
+    if len(body) > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="请求体过大"
+        )
+    
     try:
-        workflow_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
+        data = orjson.loads(body)
+        name = data["name"]
+        nodes = data["nodes"]
+        edges = data["edges"]
+        description = data.get("description") or ""
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"工作流数据格式错误: {str(e)}"
+        )
+    
+    if (
+        not isinstance(name, str)
+        or not isinstance(nodes, list)
+        or not isinstance(edges, list)
+        or not all(isinstance(item, dict) for item in nodes)
+        or not all(isinstance(item, dict) for item in edges)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="工作流数据格式错误: name 必须为字符串，nodes 与 edges 必须为对象列表"
+        )
+    
+    try:
+        workflow_id = uuid.uuid4().hex
+        now = now_iso()
         
         workflow_data = {
             "id": workflow_id,
-            "name": workflow.name,
-            "description": workflow.description,
+            "name": name,
+            "description": description,
             "configuration": {
-                "nodes": workflow.nodes,
-                "edges": workflow.edges
+                "nodes": nodes,
+                "edges": edges
             },
             "status": "draft",
             "created_at": now,
             "updated_at": now
         }
         
-        workflow_file = os.path.join(settings.WORKFLOWS_DIR, f"{workflow_id}.json")
-        JSONStorage.save_json(workflow_file, workflow_data)
+        await asyncio.to_thread(WorkflowStorage.save_workflow, workflow_data)
         
         return {
             "success": True,
@@ -70,41 +115,46 @@ async def create_workflow(workflow: WorkflowCreate):
 @router.get("/", response_model=dict)
 async def list_workflows():
     """获取工作流列表"""
+    # 分块返回随索引增量维护的预序列化响应，不在内存中构建完整列表；
+    # 先读取首块，使读取或重建索引失败时仍能返回错误状态码
+    chunks = WorkflowStorage.aiter_list_response()
     try:
-        workflows = []
-        
-        for file_name in os.listdir(settings.WORKFLOWS_DIR):
-            if file_name.endswith(".json"):
-                workflow_file = os.path.join(settings.WORKFLOWS_DIR, file_name)
-                workflow_data = JSONStorage.load_json(workflow_file)
-                
-                if workflow_data:
-                    workflows.append({
-                        "id": workflow_data["id"],
-                        "name": workflow_data["name"],
-                        "description": workflow_data["description"],
-                        "status": workflow_data["status"],
-                        "created_at": workflow_data["created_at"],
-                        "updated_at": workflow_data["updated_at"]
-                    })
-        
-        # 按更新时间排序
-        workflows.sort(key=lambda x: x["updated_at"], reverse=True)
-        
-        return {"workflows": workflows}
-    
+        first_chunk = await anext(chunks)
+    except StopAsyncIteration:
+        first_chunk = b""
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取工作流列表失败: {str(e)}"
         )
+    
+    async def body():
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+    
+    return StreamingResponse(body(), media_type="application/json")
 
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(workflow_id: str):
     """获取工作流详情"""
-    workflow_file = os.path.join(settings.WORKFLOWS_DIR, f"{workflow_id}.json")
-    workflow_data = JSONStorage.load_json(workflow_file)
+    # 保存时已生成响应字节，直接返回
+    content = await WorkflowStorage.aget_response(workflow_id)
+    
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="工作流不存在"
+        )
+    
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/{workflow_id}/export")
+async def export_workflow(workflow_id: str):
+    """导出工作流为JSON文件"""
+    workflow_data = await WorkflowStorage.aload_workflow(workflow_id)
     
     if not workflow_data:
         raise HTTPException(
@@ -112,17 +162,22 @@ async def get_workflow(workflow_id: str):
             detail="工作流不存在"
         )
     
-    return WorkflowResponse(**workflow_data)
+    return Response(
+        content=orjson.dumps(workflow_data, option=orjson.OPT_INDENT_2),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{workflow_id}.json"'}
+    )
 
 
 @router.post("/{workflow_id}/execute", response_model=dict)
-async def execute_workflow(workflow_id: str, parameters: Optional[dict] = None):
+async def execute_workflow(
+    workflow_id: str,
+    parameters: Optional[dict] = None,
+    db: AsyncSession = Depends(get_db)
+):
     """执行工作流"""
-    # 检查工作流是否存在
-    workflow_file = os.path.join(settings.WORKFLOWS_DIR, f"{workflow_id}.json")
-    workflow_data = JSONStorage.load_json(workflow_file)
-    
-    if not workflow_data:
+    # 仅检查工作流文件是否存在，解析留给实际执行时进行
+    if not await WorkflowStorage.aexists(workflow_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="工作流不存在"
@@ -130,23 +185,20 @@ async def execute_workflow(workflow_id: str, parameters: Optional[dict] = None):
     
     try:
         # 创建任务ID
-        task_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
+        task_id = uuid.uuid4().hex
         
         # 创建任务记录
-        task_data = {
-            "id": task_id,
-            "workflow_id": workflow_id,
-            "status": "pending",
-            "parameters": parameters or {},
-            "result": {},
-            "started_at": now,
-            "completed_at": "",
-            "created_at": now
-        }
-        
-        task_file = os.path.join(settings.TASKS_DIR, f"{task_id}.json")
-        JSONStorage.save_json(task_file, task_data)
+        db.add(Task(
+            id=task_id,
+            name=f"执行工作流: {workflow_id}",
+            task_type="workflow",
+            status="pending",
+            parameters={
+                "workflow_id": workflow_id,
+                "parameters": parameters or {}
+            }
+        ))
+        await db.commit()
         
         # TODO: 这里应该启动Celery任务来异步执行工作流
         # 现在先返回任务ID
@@ -157,7 +209,8 @@ async def execute_workflow(workflow_id: str, parameters: Optional[dict] = None):
         }
     
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"执行工作流失败: {str(e)}"
-        )
\ No newline at end of file
+        )
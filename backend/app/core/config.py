@@ -1,9 +1,23 @@
 """应用程序配置设置"""
 
 import os
+from functools import lru_cache
+from pathlib import Path
 from typing import List
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
+# 由 DATA_DIR 派生的数据子目录
+DERIVED_DATA_DIRS = {
+    "UPLOAD_DIR": "uploads",
+    "PROJECTS_DIR": "projects",
+    "WORKFLOWS_DIR": "workflows",
+    "EXECUTIONS_DIR": "executions",
+    "TASKS_DIR": "tasks",
+    "CHARTS_DIR": "charts",
+    "TEMP_DIR": "temp",
+}
+
 
 class Settings(BaseSettings):
     """应用程序设置"""
@@ -16,6 +30,9 @@ class Settings(BaseSettings):
     # 服务器设置
     HOST: str = os.getenv("HOST", "127.0.0.1")
     PORT: int = int(os.getenv("PORT", "8000"))
+    # 工作进程数（调试模式下固定为1以支持热重载）；作业存储与任务状态写入均在进程内，
+    # 取消/重试需落在创建任务的同一进程，因此默认单进程，生产环境可按 2*CPU+1 调大
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
     
     # CORS设置
     ALLOWED_HOSTS: List[str] = [
@@ -25,15 +42,15 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173"
     ]
     
-    # 数据存储设置
-    DATA_DIR: str = os.getenv("DATA_DIR", "../data")
-    UPLOAD_DIR: str = os.path.join(DATA_DIR, "uploads")
-    PROJECTS_DIR: str = os.path.join(DATA_DIR, "projects")
-    WORKFLOWS_DIR: str = os.path.join(DATA_DIR, "workflows")
-    EXECUTIONS_DIR: str = os.path.join(DATA_DIR, "executions")
-    TASKS_DIR: str = os.path.join(DATA_DIR, "tasks")
-    CHARTS_DIR: str = os.path.join(DATA_DIR, "charts")
-    TEMP_DIR: str = os.path.join(DATA_DIR, "temp")
+    # 数据存储设置（子目录未显式配置时由 DATA_DIR 派生）
+    DATA_DIR: Path = Path(os.getenv("DATA_DIR", "../data"))
+    UPLOAD_DIR: Path = DATA_DIR / "uploads"
+    PROJECTS_DIR: Path = DATA_DIR / "projects"
+    WORKFLOWS_DIR: Path = DATA_DIR / "workflows"
+    EXECUTIONS_DIR: Path = DATA_DIR / "executions"
+    TASKS_DIR: Path = DATA_DIR / "tasks"
+    CHARTS_DIR: Path = DATA_DIR / "charts"
+    TEMP_DIR: Path = DATA_DIR / "temp"
     
     # 文件上传设置
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
@@ -41,23 +58,48 @@ class Settings(BaseSettings):
     
     # 数据库设置
     DATABASE_URL: str = os.getenv("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(DATA_DIR, 'dlflow.db')}")
+    # 连接池大小；多进程部署时总连接数为 WORKERS × (DB_POOL_SIZE + DB_MAX_OVERFLOW)，
+    # 使用PostgreSQL时需低于服务端 max_connections（默认100）
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    # 每个连接缓存的预编译语句数量
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
     
     # 任务调度设置
     SCHEDULER_TIMEZONE: str = os.getenv("SCHEDULER_TIMEZONE", "Asia/Shanghai")
+    # 每个作业对应一次任务执行：错过的运行合并为一次、同一作业不并发；
+    # 事件循环繁忙导致的延迟在宽限时间内仍会执行（APScheduler 默认仅1秒，超时的任务会被静默丢弃）
     SCHEDULER_JOB_DEFAULTS: dict = {
-        "coalesce": False,
-        "max_instances": 3
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": 300
     }
+    # 任务运行超过该时长（秒）才写入 running 状态，短任务只在结束时写一次
+    TASK_RUNNING_REPORT_DELAY: float = float(os.getenv("TASK_RUNNING_REPORT_DELAY", "1.0"))
     
     # 数据处理设置
     TIME_COLUMNS: List[str] = ["DateTime", "tagTime"]
     DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
     TAGTIME_FORMAT: str = "%Y%m%d%H"
     
+    @model_validator(mode="after")
+    def _derive_data_dirs(self) -> "Settings":
+        """根据实际的 DATA_DIR 计算子目录，使环境变量覆盖能够传递"""
+        for field, subdir in DERIVED_DATA_DIRS.items():
+            if field not in self.model_fields_set:
+                setattr(self, field, self.DATA_DIR / subdir)
+        return self
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
+@lru_cache
+def get_settings() -> Settings:
+    """获取全局设置（只构建一次）"""
+    return Settings()
+
+
 # 创建全局设置实例
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
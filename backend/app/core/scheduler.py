@@ -3,26 +3,31 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.asyncio import AsyncIOExecutor
-from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
 import logging
 import uuid
 
 from app.core.config import settings
-from app.database import get_db
+from app.database import AsyncSessionLocal
 from app.models.task import Task
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import case, literal, select, update
 
 logger = logging.getLogger(__name__)
 
+# 状态事件批量写入：单批最大条数与等待聚合的时间窗口（秒）
+STATUS_BATCH_SIZE = 128
+STATUS_FLUSH_INTERVAL = 0.05
+
 
 class TaskScheduler:
     """任务调度器"""
     
     def __init__(self):
-        # 配置作业存储
+        # 配置作业存储：任务表本身即持久化记录（启动时由 TaskManager 恢复待执行任务），
+        # 作业只保存在内存中，调度器按下一次运行时间定时唤醒而无需轮询数据库
         jobstores = {
             'default': MemoryJobStore()
         }
@@ -43,18 +48,40 @@ class TaskScheduler:
             timezone=settings.SCHEDULER_TIMEZONE
         )
         
-        # 添加事件监听器
-        self.scheduler.add_listener(self._job_executed, EVENT_JOB_EXECUTED)
-        self.scheduler.add_listener(self._job_error, EVENT_JOB_ERROR)
+        # 任务状态事件队列: (任务ID, 待更新字段)，由单个写入协程批量落库；None 为停止标记
+        self._events: asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]] = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
     
     async def start(self):
         """启动调度器"""
+        self._writer_task = asyncio.create_task(self._writer_loop())
         self.scheduler.start()
         logger.info("任务调度器已启动")
     
     async def shutdown(self):
         """关闭调度器"""
         self.scheduler.shutdown()
+        
+        # 先摘下写入协程使后续状态更新直接写库，再放入停止标记，
+        # 写入协程落库标记之前的全部事件后自行退出，不会在批次中途被取消
+        writer_task, self._writer_task = self._writer_task, None
+        if writer_task and not writer_task.done():
+            self._events.put_nowait(None)
+            try:
+                await writer_task
+            except Exception as e:
+                logger.error(f"状态写入协程异常退出: {e}")
+        
+        # 写入协程异常退出时残留的事件在此补写
+        remaining = []
+        while not self._events.empty():
+            event = self._events.get_nowait()
+            if event is not None:
+                remaining.append(event)
+        if remaining:
+            async with AsyncSessionLocal() as db:
+                await self._write_events(db, remaining)
+        
         logger.info("任务调度器已关闭")
     
     async def add_task(
@@ -72,36 +99,66 @@ class TaskScheduler:
         
         job_id = f"task_{task_id}"
         
+        # 由包装函数在作业内部完成状态流转，不再依赖事件监听器
+        wrap_args = (task_id, func, args, kwargs)
+        
         if run_date:
             # 定时任务
             job = self.scheduler.add_job(
-                func,
+                self._wrap,
                 'date',
                 run_date=run_date,
-                args=args,
-                kwargs=kwargs,
+                args=wrap_args,
                 id=job_id,
                 **job_kwargs
             )
         else:
             # 立即执行
             job = self.scheduler.add_job(
-                func,
-                args=args,
-                kwargs=kwargs,
+                self._wrap,
+                args=wrap_args,
                 id=job_id,
                 **job_kwargs
             )
         
-        logger.info(f"任务已添加: {job_id}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"任务已添加: {job_id}")
         return job.id
     
+    async def add_tasks_bulk(
+        self,
+        specs: List[Tuple[str, Any, tuple, Optional[datetime]]]
+    ) -> List[str]:
+        """批量添加任务，返回添加失败的任务ID
+        
+        specs 为 (任务ID, 执行函数, 参数, 计划时间) 列表；添加期间暂停调度器，
+        全部作业加入后恢复时只进行一次作业处理
+        """
+        failed = []
+        paused = self.scheduler.running
+        if paused:
+            self.scheduler.pause()
+        
+        try:
+            for task_id, func, args, run_date in specs:
+                try:
+                    await self.add_task(task_id, func, args=args, run_date=run_date)
+                except Exception as e:
+                    logger.error(f"添加任务失败: task_{task_id}, 错误: {e}")
+                    failed.append(task_id)
+        finally:
+            if paused:
+                self.scheduler.resume()
+        
+        return failed
+    
     async def remove_task(self, task_id: str) -> bool:
         """移除任务"""
         job_id = f"task_{task_id}"
         try:
             self.scheduler.remove_job(job_id)
-            logger.info(f"任务已移除: {job_id}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"任务已移除: {job_id}")
             return True
         except Exception as e:
             logger.error(f"移除任务失败: {job_id}, 错误: {e}")
@@ -137,48 +194,156 @@ class TaskScheduler:
             for job in jobs
         ]
     
-    async def _job_executed(self, event):
-        """任务执行完成事件处理"""
-        job_id = event.job_id
-        if job_id.startswith("task_"):
-            task_id = job_id.replace("task_", "")
-            await self._update_task_status(task_id, "completed")
-            logger.info(f"任务执行完成: {job_id}")
-    
-    async def _job_error(self, event):
-        """任务执行错误事件处理"""
-        job_id = event.job_id
-        if job_id.startswith("task_"):
-            task_id = job_id.replace("task_", "")
-            await self._update_task_status(task_id, "failed", str(event.exception))
-            logger.error(f"任务执行失败: {job_id}, 错误: {event.exception}")
-    
-    async def _update_task_status(self, task_id: str, status: str, error_message: str = None):
-        """更新任务状态"""
+    def queue_task_update(self, task_id: str, values: Dict[str, Any]) -> bool:
+        """将任务字段更新交给写入协程批量落库，写入协程未运行时返回False由调用方直接写库"""
+        if self._writer_task is None or self._writer_task.done():
+            return False
+        self._events.put_nowait((task_id, values))
+        return True
+    
+    async def record_task_update(self, task_id: str, values: Dict[str, Any]):
+        """记录任务字段更新：写入协程运行时交由其批量落库，否则直接写库"""
+        if self.queue_task_update(task_id, values):
+            return
+        
         try:
-            async for db in get_db():
-                # 更新任务状态
-                update_data = {
-                    "status": status,
-                    "end_time": datetime.now()
-                }
-                
-                if status == "running":
-                    update_data["start_time"] = datetime.now()
-                    update_data.pop("end_time")
+            async with AsyncSessionLocal() as db, db.begin():
+                await db.execute(
+                    update(Task)
+                    .where(Task.id == task_id)
+                    .values(**values)
+                )
+        except Exception as e:
+            logger.error(f"更新任务状态失败: {task_id}, 错误: {e}")
+    
+    async def _report_running(self, task_id: str, start_time: datetime):
+        """运行超过阈值后上报 running 状态"""
+        await asyncio.sleep(settings.TASK_RUNNING_REPORT_DELAY)
+        await self.record_task_update(task_id, {"status": "running", "start_time": start_time})
+    
+    @staticmethod
+    async def _stop_report(report: asyncio.Task):
+        """取消 running 上报并等待其结束，保证直接写库时不会晚于最终状态"""
+        report.cancel()
+        await asyncio.gather(report, return_exceptions=True)
+    
+    async def _wrap(self, task_id: str, func, args: tuple, kwargs: dict):
+        """执行作业，状态更新交给写入协程批量落库（未运行时直接写库）；短任务只在结束时写一次（含开始时间）"""
+        job_id = f"task_{task_id}"
+        start_time = datetime.now()
+        # 运行超过阈值时才上报 running 状态，任务提前结束则取消
+        running_report = asyncio.create_task(self._report_running(task_id, start_time))
+        
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func(*args, **kwargs)
+            else:
+                # 同步作业放入线程池执行，避免阻塞事件循环
+                await asyncio.to_thread(func, *args, **kwargs)
+            await self._stop_report(running_report)
+            await self.record_task_update(task_id, {
+                "status": "completed",
+                "start_time": start_time,
+                "end_time": datetime.now()
+            })
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"任务执行完成: {job_id}")
+        except Exception as e:
+            await self._stop_report(running_report)
+            await self.record_task_update(task_id, {
+                "status": "failed",
+                "start_time": start_time,
+                "end_time": datetime.now(),
+                "error_message": str(e)
+            })
+            logger.error(f"任务执行失败: {job_id}, 错误: {e}")
+    
+    async def _writer_loop(self):
+        """后台写入协程：持有一个会话，聚合短时间窗口内的状态事件后一次提交"""
+        loop = asyncio.get_running_loop()
+        async with AsyncSessionLocal() as db:
+            while True:
+                event = await self._events.get()
+                if event is None:
+                    return
+                batch = [event]
+                stopping = False
+                deadline = loop.time() + STATUS_FLUSH_INTERVAL
                 
-                if error_message:
-                    update_data["error_message"] = error_message
+                while len(batch) < STATUS_BATCH_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        event = await asyncio.wait_for(self._events.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if event is None:
+                        stopping = True
+                        break
+                    batch.append(event)
                 
+                await self._write_events(db, batch)
+                if stopping:
+                    return
+    
+    @staticmethod
+    def _merge_events(events: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """按任务合并一批状态事件，返回 任务ID -> 待更新字段"""
+        # 同一任务的多个事件按发生顺序合并，后发生的字段值覆盖先前的值；
+        # 错误信息保留最先记录的一条（执行器记录的完整堆栈优先于调度器的简短信息）
+        merged: Dict[str, Dict[str, Any]] = {}
+        for task_id, values in events:
+            task_values = merged.setdefault(task_id, {})
+            for name, value in values.items():
+                if name == "error_message" and task_values.get(name):
+                    continue
+                task_values[name] = value
+        return merged
+    
+    @staticmethod
+    async def _write_events(db: AsyncSession, events: List[Tuple[str, Dict[str, Any]]]):
+        """将一批状态事件合并为一条 CASE WHEN 批量 UPDATE 并提交，批量提交失败时逐条重写"""
+        merged = TaskScheduler._merge_events(events)
+        
+        names = {name for values in merged.values() for name in values}
+        columns = {}
+        for name in names:
+            column = getattr(Task, name)
+            whens = {
+                task_id: literal(values[name], column.type)
+                for task_id, values in merged.items()
+                if name in values
+            }
+            columns[name] = case(whens, value=Task.id, else_=column)
+        
+        try:
+            await db.execute(
+                update(Task)
+                .where(Task.id.in_(list(merged)))
+                .values(**columns)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"批量更新任务状态失败，改为逐条写入: {list(merged)}, 错误: {e}")
+        else:
+            return
+        
+        # 单个任务的异常值不应连累同批次的其他任务
+        for task_id, values in merged.items():
+            try:
                 await db.execute(
                     update(Task)
                     .where(Task.id == task_id)
-                    .values(**update_data)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
                 )
                 await db.commit()
-                break
-        except Exception as e:
-            logger.error(f"更新任务状态失败: {task_id}, 错误: {e}")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"更新任务状态失败: {task_id}, 错误: {e}")
 
 
 # 全局调度器实例
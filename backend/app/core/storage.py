@@ -1,18 +1,93 @@
 """数据存储管理模块"""
 
+import asyncio
 import os
-import json
+import tempfile
+import threading
 import uuid
+from collections import OrderedDict
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Union
 from pathlib import Path
 
+import aiofiles
+import aiofiles.os
+import ijson
+import msgspec
+import orjson
+import ormsgpack
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.core.config import settings
+from app.core.time_util import now_iso
+from app.models.execution import Execution
+
+# 超过该大小的JSON在线程中解析，避免阻塞事件循环
+LARGE_JSON_THRESHOLD = 1024 * 1024
+
+# 批量读取时同时进行的文件读取数量上限
+BULK_LOAD_CONCURRENCY = 64
+
+# 流式返回文件内容时的分块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 工作流数据文件后缀（旧版本使用 .json，读取时兼容）
+WORKFLOW_SUFFIX = ".msgpack"
+
+# 预序列化响应文件后缀，与数据文件放在同一目录
+RESPONSE_SUFFIX = ".resp.json"
+
+# 已解析JSON的进程内缓存: 路径 -> (st_mtime_ns, 数据)
+JSON_CACHE_MAX_ENTRIES = 1024
+_json_cache: "OrderedDict[str, tuple[int, Dict[str, Any]]]" = OrderedDict()
+
+
+def _cache_get(file_path: str, mtime_ns: int) -> Optional[Dict[str, Any]]:
+    """命中且文件未修改时返回缓存数据"""
+    hit = _json_cache.get(file_path)
+    if hit is None or hit[0] != mtime_ns:
+        return None
+    _json_cache.move_to_end(file_path)
+    return hit[1]
+
+
+def _cache_put(file_path: str, mtime_ns: int, data: Dict[str, Any]):
+    """写入缓存并按LRU淘汰超出上限的条目"""
+    _json_cache[file_path] = (mtime_ns, data)
+    _json_cache.move_to_end(file_path)
+    while len(_json_cache) > JSON_CACHE_MAX_ENTRIES:
+        _json_cache.popitem(last=False)
+
 
+def _load_cached(file_path: str, loader: Callable[[str], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """按修改时间校验的缓存加载，未命中时由 loader 读取；读取失败的结果不缓存"""
+    try:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        _json_cache.pop(file_path, None)
+        return None
+    
+    data = _cache_get(file_path, mtime_ns)
+    if data is None:
+        data = loader(file_path)
+        if data is not None:
+            _cache_put(file_path, mtime_ns, data)
+    return data
+
+
+# 数据目录是否已创建（进程内只需创建一次）
+_ENSURED = False
 
-def ensure_data_directories():
-    """确保所有数据目录存在"""
-    directories = [
+
+def ensure_data_directories(force: bool = False):
+    """确保所有数据目录存在，已创建过时直接返回，force=True 时重新创建"""
+    global _ENSURED
+    if _ENSURED and not force:
+        return
+    
+    for directory in (
         settings.DATA_DIR,
         settings.UPLOAD_DIR,
         settings.PROJECTS_DIR,
@@ -25,42 +100,215 @@ def ensure_data_directories():
         os.path.join(settings.EXECUTIONS_DIR, "steps"),
         os.path.join(settings.EXECUTIONS_DIR, "results"),
         os.path.join(settings.TASKS_DIR, "logs")
-    ]
+    ):
+        os.makedirs(directory, exist_ok=True)
     
-    for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+    _ENSURED = True
+
+
+@lru_cache(maxsize=1024)
+def workflow_path(workflow_id: str) -> str:
+    """工作流文件路径"""
+    return str(settings.WORKFLOWS_DIR / f"{workflow_id}{WORKFLOW_SUFFIX}")
+
+
+@lru_cache(maxsize=1024)
+def legacy_workflow_path(workflow_id: str) -> str:
+    """旧版本JSON格式的工作流文件路径"""
+    return str(settings.WORKFLOWS_DIR / f"{workflow_id}.json")
+
+
+@lru_cache(maxsize=1024)
+def workflow_response_path(workflow_id: str) -> str:
+    """工作流预序列化响应文件路径"""
+    return str(settings.WORKFLOWS_DIR / f"{workflow_id}{RESPONSE_SUFFIX}")
+
+
+def list_json_files(directory: Union[str, "os.PathLike[str]"]) -> List[str]:
+    """列出目录下的JSON数据文件（不含索引文件）"""
+    with os.scandir(directory) as it:
+        return [
+            entry.path
+            for entry in it
+            if entry.name.endswith(".json")
+            and entry.name != "index.json"
+            and not entry.name.endswith(RESPONSE_SUFFIX)
+            and entry.is_file(follow_symlinks=False)
+        ]
 
 
 class JSONStorage:
     """JSON文件存储管理器"""
     
     @staticmethod
-    def save_json(file_path: str, data: Dict[str, Any]) -> bool:
-        """保存JSON数据到文件"""
+    def save_json(file_path: str, data: Dict[str, Any], indent: bool = False) -> bool:
+        """保存JSON数据到文件（先写临时文件再原子替换，读取方不会读到写了一半的文件）"""
+        _json_cache.pop(file_path, None)
         try:
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-            return True
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            content = orjson.dumps(data, default=str, option=option)
         except Exception as e:
             print(f"Error saving JSON to {file_path}: {e}")
             return False
+        return JSONStorage.save_bytes(file_path, content)
     
     @staticmethod
     def load_json(file_path: str) -> Optional[Dict[str, Any]]:
         """从文件加载JSON数据"""
         try:
-            if not os.path.exists(file_path):
-                return None
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"Error loading JSON from {file_path}: {e}")
             return None
     
+    @staticmethod
+    async def asave_json(file_path: str, data: Dict[str, Any], indent: bool = False) -> bool:
+        """异步保存JSON数据到文件（与 save_json 相同，经临时文件原子替换，写入放入线程池）"""
+        _json_cache.pop(file_path, None)
+        try:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            content = orjson.dumps(data, default=str, option=option)
+        except Exception as e:
+            print(f"Error saving JSON to {file_path}: {e}")
+            return False
+        return await asyncio.to_thread(JSONStorage.save_bytes, file_path, content)
+    
+    @staticmethod
+    async def aload_json(file_path: str) -> Optional[Dict[str, Any]]:
+        """异步从文件加载JSON数据"""
+        try:
+            async with aiofiles.open(file_path, 'rb') as f:
+                content = await f.read()
+            if len(content) > LARGE_JSON_THRESHOLD:
+                return await asyncio.to_thread(orjson.loads, content)
+            return orjson.loads(content)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading JSON from {file_path}: {e}")
+            return None
+    
+    @staticmethod
+    def load_json_cached(file_path: str) -> Optional[Dict[str, Any]]:
+        """按修改时间校验的缓存加载，返回的数据为共享对象，调用方不可修改"""
+        return _load_cached(file_path, JSONStorage.load_json)
+    
+    @staticmethod
+    async def aload_json_cached(file_path: str) -> Optional[Dict[str, Any]]:
+        """异步版本的缓存加载，返回的数据为共享对象，调用方不可修改"""
+        try:
+            mtime_ns = (await aiofiles.os.stat(file_path)).st_mtime_ns
+        except FileNotFoundError:
+            _json_cache.pop(file_path, None)
+            return None
+        
+        data = _cache_get(file_path, mtime_ns)
+        if data is None:
+            data = await JSONStorage.aload_json(file_path)
+            if data is not None:
+                _cache_put(file_path, mtime_ns, data)
+        return data
+    
+    @staticmethod
+    async def abulk_load(file_paths: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """并发批量加载多个JSON文件，结果顺序与输入路径一致"""
+        semaphore = asyncio.Semaphore(BULK_LOAD_CONCURRENCY)
+        
+        async def _load(file_path: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await JSONStorage.aload_json(file_path)
+        
+        return await asyncio.gather(*(_load(path) for path in file_paths))
+    
+    @staticmethod
+    def save_msgpack(file_path: str, data: Dict[str, Any]) -> bool:
+        """保存msgpack数据到文件（先写临时文件再原子替换）"""
+        try:
+            content = ormsgpack.packb(data, default=str, option=ormsgpack.OPT_SERIALIZE_NUMPY)
+        except Exception as e:
+            print(f"Error encoding msgpack for {file_path}: {e}")
+            return False
+        return JSONStorage.save_bytes(file_path, content)
+    
+    @staticmethod
+    def load_msgpack(file_path: str) -> Optional[Dict[str, Any]]:
+        """从文件加载msgpack数据"""
+        try:
+            with open(file_path, 'rb') as f:
+                return ormsgpack.unpackb(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading msgpack from {file_path}: {e}")
+            return None
+    
+    @staticmethod
+    async def aload_msgpack(file_path: str) -> Optional[Dict[str, Any]]:
+        """异步从文件加载msgpack数据"""
+        content = await JSONStorage.aload_bytes(file_path)
+        if content is None:
+            return None
+        try:
+            if len(content) > LARGE_JSON_THRESHOLD:
+                return await asyncio.to_thread(ormsgpack.unpackb, content)
+            return ormsgpack.unpackb(content)
+        except Exception as e:
+            print(f"Error loading msgpack from {file_path}: {e}")
+            return None
+    
+    @staticmethod
+    def save_bytes(file_path: str, content: bytes) -> bool:
+        """将已序列化的字节写入文件（先写临时文件再原子替换）
+        
+        临时文件在目标目录中唯一创建，并发写入同一文件时各自完整替换，不会互相截断
+        """
+        tmp_path = None
+        try:
+            directory = os.path.dirname(file_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp"
+            )
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+            return True
+        except Exception as e:
+            print(f"Error saving bytes to {file_path}: {e}")
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return False
+    
+    @staticmethod
+    async def aload_bytes(file_path: str) -> Optional[bytes]:
+        """异步读取文件原始字节，文件不存在时返回None"""
+        try:
+            async with aiofiles.open(file_path, 'rb') as f:
+                return await f.read()
+        except FileNotFoundError:
+            return None
+    
+    @staticmethod
+    async def aiter_bytes(file_path: str, chunk_size: int = STREAM_CHUNK_SIZE):
+        """异步分块读取文件，用于流式响应"""
+        async with aiofiles.open(file_path, 'rb') as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+    
     @staticmethod
     def delete_file(file_path: str) -> bool:
         """删除文件"""
+        _json_cache.pop(file_path, None)
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -70,14 +318,80 @@ class JSONStorage:
             return False
 
 
+class IndexStorage:
+    """摘要索引文件管理器，按条目增量维护避免全目录扫描"""
+    
+    # 索引文件为读取-修改-写回，保存可能在多个线程中并发执行（asyncio.to_thread），
+    # 索引及由其派生的列表响应文件的更新都需持有该锁；可重入以便在持锁时全量重建
+    lock = threading.RLock()
+    
+    @staticmethod
+    def load_entries(index_file: str, key: str) -> Optional[List[Dict[str, Any]]]:
+        """读取索引条目，索引文件不存在时返回None"""
+        index_data = JSONStorage.load_json(index_file)
+        if index_data is None:
+            return None
+        return index_data.get(key, [])
+    
+    @staticmethod
+    async def aload_entries(index_file: str, key: str) -> Optional[List[Dict[str, Any]]]:
+        """异步读取索引条目，索引文件不存在时返回None"""
+        index_data = await JSONStorage.aload_json(index_file)
+        if index_data is None:
+            return None
+        return index_data.get(key, [])
+    
+    @staticmethod
+    def save_entries(index_file: str, key: str, entries: List[Dict[str, Any]]) -> bool:
+        """保存索引条目"""
+        index_data = {
+            key: entries,
+            "total_count": len(entries),
+            "last_updated": now_iso()
+        }
+        return JSONStorage.save_json(index_file, index_data, indent=True)
+    
+    @staticmethod
+    def upsert_entry(index_file: str, key: str, entry: Dict[str, Any],
+                     sort_field: str,
+                     rebuild: Callable[[], List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+        """插入或替换索引条目，索引缺失时全量重建；返回更新后的条目，保存失败时返回None"""
+        with IndexStorage.lock:
+            entries = IndexStorage.load_entries(index_file, key)
+            if entries is None:
+                return rebuild()
+            
+            entries = [e for e in entries if e["id"] != entry["id"]]
+            entries.append(entry)
+            entries.sort(key=lambda x: x[sort_field], reverse=True)
+            
+            if not IndexStorage.save_entries(index_file, key, entries):
+                return None
+            return entries
+    
+    @staticmethod
+    def remove_entry(index_file: str, key: str, entry_id: str,
+                     rebuild: Callable[[], List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+        """移除索引条目，索引缺失时全量重建；返回更新后的条目，保存失败时返回None"""
+        with IndexStorage.lock:
+            entries = IndexStorage.load_entries(index_file, key)
+            if entries is None:
+                return rebuild()
+            
+            entries = [e for e in entries if e["id"] != entry_id]
+            if not IndexStorage.save_entries(index_file, key, entries):
+                return None
+            return entries
+
+
 class ProjectStorage:
     """项目存储管理器"""
     
     @staticmethod
     def create_project(name: str, description: str = "", metadata: Dict[str, Any] = None) -> str:
         """创建新项目"""
-        project_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
+        project_id = uuid.uuid4().hex
+        now = now_iso()
         
         project_data = {
             "id": project_id,
@@ -98,7 +412,7 @@ class ProjectStorage:
         JSONStorage.save_json(project_file, project_data)
         
         # 更新项目索引
-        ProjectStorage.update_project_index()
+        ProjectStorage._index_project(project_data)
         
         return project_id
     
@@ -106,7 +420,7 @@ class ProjectStorage:
     def get_project(project_id: str) -> Optional[Dict[str, Any]]:
         """获取项目信息"""
         project_file = os.path.join(settings.PROJECTS_DIR, f"{project_id}.json")
-        return JSONStorage.load_json(project_file)
+        return JSONStorage.load_json_cached(project_file)
     
     @staticmethod
     def update_project(project_id: str, updates: Dict[str, Any]) -> bool:
@@ -115,14 +429,15 @@ class ProjectStorage:
         if not project:
             return False
         
-        project.update(updates)
-        project["updated_at"] = datetime.now().isoformat()
+        # 缓存数据为共享对象，复制后再修改
+        project = {**project, **updates}
+        project["updated_at"] = now_iso()
         
         project_file = os.path.join(settings.PROJECTS_DIR, f"{project_id}.json")
         success = JSONStorage.save_json(project_file, project)
         
         if success:
-            ProjectStorage.update_project_index()
+            ProjectStorage._index_project(project)
         
         return success
     
@@ -133,123 +448,396 @@ class ProjectStorage:
         success = JSONStorage.delete_file(project_file)
         
         if success:
-            ProjectStorage.update_project_index()
+            IndexStorage.remove_entry(
+                ProjectStorage._index_file(), "projects", project_id,
+                ProjectStorage.update_project_index
+            )
         
         return success
     
     @staticmethod
     def list_projects() -> List[Dict[str, Any]]:
         """获取项目列表"""
-        index_file = os.path.join(settings.PROJECTS_DIR, "index.json")
-        index_data = JSONStorage.load_json(index_file)
-        
-        if not index_data:
-            return []
-        
-        return index_data.get("projects", [])
+        return IndexStorage.load_entries(ProjectStorage._index_file(), "projects") or []
     
     @staticmethod
-    def update_project_index():
-        """更新项目索引"""
-        projects = []
-        
-        # 扫描所有项目文件
-        for file_name in os.listdir(settings.PROJECTS_DIR):
-            if file_name.endswith(".json") and file_name != "index.json":
-                project_file = os.path.join(settings.PROJECTS_DIR, file_name)
+    def _index_file() -> str:
+        """项目索引文件路径"""
+        return os.path.join(settings.PROJECTS_DIR, "index.json")
+    
+    @staticmethod
+    def _index_entry(project_data: Dict[str, Any]) -> Dict[str, Any]:
+        """构建项目索引条目"""
+        return {
+            "id": project_data["id"],
+            "name": project_data["name"],
+            "status": project_data["status"],
+            "created_at": project_data["created_at"],
+            "updated_at": project_data["updated_at"]
+        }
+    
+    @staticmethod
+    def _index_project(project_data: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """增量更新单个项目的索引条目"""
+        return IndexStorage.upsert_entry(
+            ProjectStorage._index_file(), "projects",
+            ProjectStorage._index_entry(project_data), "updated_at",
+            ProjectStorage.update_project_index
+        )
+    
+    @staticmethod
+    def update_project_index() -> List[Dict[str, Any]]:
+        """全量重建项目索引（仅用于索引缺失时的恢复）"""
+        with IndexStorage.lock:
+            projects = []
+            
+            for project_file in list_json_files(settings.PROJECTS_DIR):
                 project_data = JSONStorage.load_json(project_file)
                 
                 if project_data:
-                    projects.append({
-                        "id": project_data["id"],
-                        "name": project_data["name"],
-                        "status": project_data["status"],
-                        "created_at": project_data["created_at"],
-                        "updated_at": project_data["updated_at"]
-                    })
+                    projects.append(ProjectStorage._index_entry(project_data))
+            
+            # 按更新时间排序
+            projects.sort(key=lambda x: x["updated_at"], reverse=True)
+            
+            IndexStorage.save_entries(ProjectStorage._index_file(), "projects", projects)
+            return projects
+
+
+# 工作流索引条目包含的顶层字段
+WORKFLOW_INDEX_FIELDS = ("id", "name", "description", "status", "created_at", "updated_at")
+
+
+class WorkflowStorage:
+    """工作流存储管理器"""
+    
+    @staticmethod
+    def _index_file() -> str:
+        """工作流索引文件路径"""
+        return os.path.join(settings.WORKFLOWS_DIR, "index.json")
+    
+    @staticmethod
+    def resolve_path(workflow_id: str) -> Optional[str]:
+        """返回工作流数据文件的实际路径，优先msgpack，其次旧版本JSON，均不存在时返回None"""
+        for file_path in (workflow_path(workflow_id), legacy_workflow_path(workflow_id)):
+            if os.path.isfile(file_path):
+                return file_path
+        return None
+    
+    @staticmethod
+    async def aexists(workflow_id: str) -> bool:
+        """检查工作流数据文件是否存在"""
+        return (
+            await aiofiles.os.path.isfile(workflow_path(workflow_id))
+            or await aiofiles.os.path.isfile(legacy_workflow_path(workflow_id))
+        )
+    
+    @staticmethod
+    def read_file(file_path: str) -> Optional[Dict[str, Any]]:
+        """按文件后缀解码工作流数据文件"""
+        if file_path.endswith(WORKFLOW_SUFFIX):
+            return JSONStorage.load_msgpack(file_path)
+        return JSONStorage.load_json(file_path)
+    
+    @staticmethod
+    def read_file_cached(file_path: str) -> Optional[Dict[str, Any]]:
+        """按修改时间校验的缓存读取工作流数据文件，返回的数据为共享对象，调用方不可修改"""
+        return _load_cached(file_path, WorkflowStorage.read_file)
+    
+    @staticmethod
+    def load_workflow(workflow_id: str) -> Optional[Dict[str, Any]]:
+        """加载工作流数据"""
+        file_path = WorkflowStorage.resolve_path(workflow_id)
+        return WorkflowStorage.read_file(file_path) if file_path else None
+    
+    @staticmethod
+    async def aload_workflow(workflow_id: str) -> Optional[Dict[str, Any]]:
+        """异步加载工作流数据，兼容旧版本JSON文件"""
+        workflow_data = await JSONStorage.aload_msgpack(workflow_path(workflow_id))
+        if workflow_data is None:
+            workflow_data = await JSONStorage.aload_json(legacy_workflow_path(workflow_id))
+        return workflow_data
+    
+    @staticmethod
+    def save_workflow(workflow_data: Dict[str, Any]) -> bool:
+        """以msgpack格式保存工作流，移除同名旧版本JSON文件并更新索引"""
+        workflow_id = workflow_data["id"]
+        if not JSONStorage.save_msgpack(workflow_path(workflow_id), workflow_data):
+            return False
         
-        # 按更新时间排序
-        projects.sort(key=lambda x: x["updated_at"], reverse=True)
+        JSONStorage.delete_file(legacy_workflow_path(workflow_id))
+        return WorkflowStorage.index_workflow(workflow_data)
+    
+    @staticmethod
+    def _list_workflow_files() -> List[str]:
+        """列出全部工作流数据文件，同一工作流存在两种格式时仅取msgpack"""
+        msgpack_ids = set()
+        files = []
+        with os.scandir(settings.WORKFLOWS_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(WORKFLOW_SUFFIX) and entry.is_file(follow_symlinks=False):
+                    msgpack_ids.add(entry.name[:-len(WORKFLOW_SUFFIX)])
+                    files.append(entry.path)
         
-        index_data = {
-            "projects": projects,
-            "total_count": len(projects),
-            "last_updated": datetime.now().isoformat()
+        for file_path in list_json_files(settings.WORKFLOWS_DIR):
+            if Path(file_path).stem not in msgpack_ids:
+                files.append(file_path)
+        return files
+    
+    @staticmethod
+    def _read_index_entry(file_path: str) -> Optional[Dict[str, Any]]:
+        """读取工作流文件的顶层摘要字段，旧版本JSON文件流式解析，不构建 configuration 中的节点与连线"""
+        if file_path.endswith(WORKFLOW_SUFFIX):
+            workflow_data = JSONStorage.load_msgpack(file_path)
+            if not workflow_data or "id" not in workflow_data:
+                return None
+            return {field: workflow_data.get(field, "") for field in WORKFLOW_INDEX_FIELDS}
+        
+        entry = {}
+        try:
+            with open(file_path, 'rb') as f:
+                for prefix, event, value in ijson.parse(f):
+                    if prefix in WORKFLOW_INDEX_FIELDS and event in ("string", "number", "boolean", "null"):
+                        entry[prefix] = value
+                        if len(entry) == len(WORKFLOW_INDEX_FIELDS):
+                            break
+        except Exception as e:
+            print(f"Error reading workflow summary from {file_path}: {e}")
+            return None
+        
+        if "id" not in entry:
+            return None
+        return {field: entry.get(field, "") for field in WORKFLOW_INDEX_FIELDS}
+    
+    @staticmethod
+    def _index_entry(workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+        """构建工作流索引条目"""
+        return {field: workflow_data[field] for field in WORKFLOW_INDEX_FIELDS}
+    
+    @staticmethod
+    def _list_response_file() -> str:
+        """工作流列表预序列化响应文件路径"""
+        return os.path.join(settings.WORKFLOWS_DIR, f"list{RESPONSE_SUFFIX}")
+    
+    @staticmethod
+    def _response_view(workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+        """工作流详情接口对外返回的字段"""
+        return {
+            "id": workflow_data["id"],
+            "name": workflow_data["name"],
+            "description": workflow_data["description"],
+            "configuration": workflow_data["configuration"],
+            "status": workflow_data["status"],
+            "created_at": workflow_data["created_at"],
+            "updated_at": workflow_data["updated_at"]
         }
+    
+    @staticmethod
+    def save_response(workflow_data: Dict[str, Any]) -> Optional[bytes]:
+        """预序列化工作流详情响应并写入 {id}.resp.json，返回写入的字节"""
+        content = orjson.dumps(WorkflowStorage._response_view(workflow_data))
+        JSONStorage.save_bytes(workflow_response_path(workflow_data["id"]), content)
+        return content
+    
+    @staticmethod
+    def _save_list_response(workflows: Optional[List[Dict[str, Any]]]) -> Optional[bytes]:
+        """预序列化工作流列表响应并写入 list.resp.json"""
+        if workflows is None:
+            # 索引保存失败时删除列表响应，下次请求重新生成
+            JSONStorage.delete_file(WorkflowStorage._list_response_file())
+            return None
+        content = orjson.dumps({"workflows": workflows})
+        JSONStorage.save_bytes(WorkflowStorage._list_response_file(), content)
+        return content
+    
+    @staticmethod
+    def index_workflow(workflow_data: Dict[str, Any]) -> bool:
+        """增量更新单个工作流的索引条目及预序列化响应"""
+        WorkflowStorage.save_response(workflow_data)
+        # 索引与列表响应在同一锁内更新，避免并发保存时旧列表覆盖新列表
+        with IndexStorage.lock:
+            workflows = IndexStorage.upsert_entry(
+                WorkflowStorage._index_file(), "workflows",
+                WorkflowStorage._index_entry(workflow_data), "updated_at",
+                WorkflowStorage.update_workflow_index
+            )
+            WorkflowStorage._save_list_response(workflows)
+        return workflows is not None
+    
+    @staticmethod
+    async def aget_response(workflow_id: str) -> Optional[bytes]:
+        """读取工作流详情的预序列化响应，缺失时由工作流文件生成"""
+        content = await JSONStorage.aload_bytes(workflow_response_path(workflow_id))
+        if content is not None:
+            return content
+        
+        workflow_data = await WorkflowStorage.aload_workflow(workflow_id)
+        if not workflow_data:
+            return None
+        return await asyncio.to_thread(WorkflowStorage.save_response, workflow_data)
+    
+    @staticmethod
+    async def aiter_list_response():
+        """分块返回工作流列表的预序列化响应，缺失时先由索引生成"""
+        list_file = WorkflowStorage._list_response_file()
+        if not await aiofiles.os.path.exists(list_file):
+            content = await asyncio.to_thread(WorkflowStorage._rebuild_list_response)
+            if not await aiofiles.os.path.exists(list_file):
+                # 写入失败时直接返回生成的内容
+                yield content
+                return
         
-        index_file = os.path.join(settings.PROJECTS_DIR, "index.json")
-        JSONStorage.save_json(index_file, index_data)
+        async for chunk in JSONStorage.aiter_bytes(list_file):
+            yield chunk
+    
+    @staticmethod
+    def _rebuild_list_response() -> bytes:
+        """由索引重新生成列表响应文件（持锁读取索引，保证写入的是最新条目），返回响应内容"""
+        with IndexStorage.lock:
+            workflows = WorkflowStorage.list_workflows()
+            content = WorkflowStorage._save_list_response(workflows)
+        return content or orjson.dumps({"workflows": workflows})
+    
+    @staticmethod
+    def list_workflows() -> List[Dict[str, Any]]:
+        """获取工作流列表（按更新时间倒序）"""
+        workflows = IndexStorage.load_entries(WorkflowStorage._index_file(), "workflows")
+        if workflows is None:
+            workflows = WorkflowStorage.update_workflow_index()
+        return workflows
+    
+    @staticmethod
+    async def alist_workflows() -> List[Dict[str, Any]]:
+        """异步获取工作流列表（按更新时间倒序）"""
+        workflows = await IndexStorage.aload_entries(WorkflowStorage._index_file(), "workflows")
+        if workflows is None:
+            workflows = await asyncio.to_thread(WorkflowStorage.update_workflow_index)
+        return workflows
+    
+    @staticmethod
+    def update_workflow_index() -> List[Dict[str, Any]]:
+        """全量重建工作流索引（仅用于索引缺失时的恢复）"""
+        with IndexStorage.lock:
+            workflows = []
+            
+            for workflow_file in WorkflowStorage._list_workflow_files():
+                entry = WorkflowStorage._read_index_entry(workflow_file)
+                
+                if entry:
+                    workflows.append(entry)
+            
+            # 按更新时间排序
+            workflows.sort(key=lambda x: x["updated_at"], reverse=True)
+            
+            IndexStorage.save_entries(WorkflowStorage._index_file(), "workflows", workflows)
+            WorkflowStorage._save_list_response(workflows)
+            return workflows
+
+
+class ExecutionSummary(msgspec.Struct):
+    """执行历史列表条目（仅包含列表展示所需字段）"""
+    id: str
+    workflow_id: str
+    execution_name: str
+    status: str
+    created_at: str
+    execution_time_seconds: float
 
 
 class ExecutionStorage:
-    """执行历史存储管理器"""
+    """执行历史存储管理器（数据库存储，返回与原JSON记录一致的字典结构）"""
     
     @staticmethod
-    def create_execution(project_id: str, workflow_id: str, execution_name: str, 
-                        input_parameters: Dict[str, Any]) -> str:
-        """创建执行记录"""
-        execution_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        
-        execution_data = {
-            "id": execution_id,
-            "project_id": project_id,
-            "workflow_id": workflow_id,
-            "execution_name": execution_name,
-            "input_parameters": input_parameters,
-            "output_results": {},
-            "status": "pending",
-            "started_at": now,
-            "completed_at": "",
-            "created_at": now,
-            "execution_time_seconds": 0,
-            "step_count": 0,
-            "error_message": ""
+    def _to_dict(execution: Execution) -> Dict[str, Any]:
+        """将执行记录转换为对外的字典结构"""
+        return {
+            "id": execution.id,
+            "project_id": execution.project_id,
+            "workflow_id": execution.workflow_id or "",
+            "execution_name": execution.name,
+            "input_parameters": execution.input_data or {},
+            "output_results": execution.output_data or {},
+            "status": execution.status,
+            "started_at": execution.start_time.isoformat() if execution.start_time else "",
+            "completed_at": execution.end_time.isoformat() if execution.end_time else "",
+            "created_at": execution.created_at.isoformat(),
+            "execution_time_seconds": execution.duration or 0,
+            "error_message": execution.error_message or ""
         }
+    
+    @staticmethod
+    async def create_execution(db: AsyncSession, project_id: str, workflow_id: str,
+                               execution_name: str, input_parameters: Dict[str, Any]) -> str:
+        """创建执行记录"""
+        execution_id = uuid.uuid4().hex
         
-        execution_file = os.path.join(settings.EXECUTIONS_DIR, f"{execution_id}.json")
-        JSONStorage.save_json(execution_file, execution_data)
+        db.add(Execution(
+            id=execution_id,
+            project_id=project_id,
+            workflow_id=workflow_id,
+            name=execution_name,
+            input_data=input_parameters,
+            output_data={},
+            status="pending",
+            start_time=datetime.now()
+        ))
+        await db.commit()
         
         return execution_id
     
     @staticmethod
-    def get_execution(execution_id: str) -> Optional[Dict[str, Any]]:
+    async def get_execution(db: AsyncSession, execution_id: str) -> Optional[Dict[str, Any]]:
         """获取执行记录"""
-        execution_file = os.path.join(settings.EXECUTIONS_DIR, f"{execution_id}.json")
-        return JSONStorage.load_json(execution_file)
+        result = await db.execute(select(Execution).where(Execution.id == execution_id))
+        execution = result.scalar_one_or_none()
+        return ExecutionStorage._to_dict(execution) if execution else None
     
     @staticmethod
-    def update_execution(execution_id: str, updates: Dict[str, Any]) -> bool:
-        """更新执行记录"""
-        execution = ExecutionStorage.get_execution(execution_id)
-        if not execution:
-            return False
-        
-        execution.update(updates)
-        
-        execution_file = os.path.join(settings.EXECUTIONS_DIR, f"{execution_id}.json")
-        return JSONStorage.save_json(execution_file, execution)
+    async def update_execution(db: AsyncSession, execution_id: str, updates: Dict[str, Any]) -> bool:
+        """更新执行记录（字段名与 Execution 模型一致）"""
+        result = await db.execute(
+            update(Execution).where(Execution.id == execution_id).values(**updates)
+        )
+        await db.commit()
+        return result.rowcount > 0
     
     @staticmethod
-    def delete_execution(execution_id: str) -> bool:
+    async def delete_execution(db: AsyncSession, execution_id: str) -> bool:
         """删除执行记录"""
-        execution_file = os.path.join(settings.EXECUTIONS_DIR, f"{execution_id}.json")
-        return JSONStorage.delete_file(execution_file)
+        result = await db.execute(delete(Execution).where(Execution.id == execution_id))
+        await db.commit()
+        return result.rowcount > 0
     
     @staticmethod
-    def list_project_executions(project_id: str) -> List[Dict[str, Any]]:
-        """获取项目的执行历史列表"""
-        executions = []
-        
-        for file_name in os.listdir(settings.EXECUTIONS_DIR):
-            if file_name.endswith(".json"):
-                execution_file = os.path.join(settings.EXECUTIONS_DIR, file_name)
-                execution_data = JSONStorage.load_json(execution_file)
-                
-                if execution_data and execution_data.get("project_id") == project_id:
-                    executions.append(execution_data)
-        
-        # 按创建时间排序
-        executions.sort(key=lambda x: x["created_at"], reverse=True)
-        
-        return executions
\ No newline at end of file
+    async def list_project_executions(
+        db: AsyncSession,
+        project_id: str,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[ExecutionSummary]:
+        """分页获取项目的执行历史摘要（按创建时间倒序），仅查询摘要所需的列"""
+        result = await db.execute(
+            select(
+                Execution.id,
+                Execution.workflow_id,
+                Execution.name,
+                Execution.status,
+                Execution.created_at,
+                Execution.duration
+            )
+            .where(Execution.project_id == project_id)
+            .order_by(Execution.created_at.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+        return [
+            ExecutionSummary(
+                id=row.id,
+                workflow_id=row.workflow_id or "",
+                execution_name=row.name,
+                status=row.status,
+                created_at=row.created_at.isoformat(),
+                execution_time_seconds=row.duration or 0
+            )
+            for row in result
+        ]
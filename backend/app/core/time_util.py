@@ -0,0 +1,17 @@
+"""时间工具模块"""
+
+import time
+from datetime import datetime
+
+# 最近一次格式化结果: [毫秒时间戳, ISO格式字符串]
+_last = [0, ""]
+
+
+def now_iso() -> str:
+    """返回当前本地时间的ISO格式字符串，同一毫秒内复用已格式化的结果"""
+    t = time.time_ns() // 1_000_000
+    if t == _last[0]:
+        return _last[1]
+    s = datetime.fromtimestamp(t / 1000).isoformat()
+    _last[:] = [t, s]
+    return s
@@ -1,27 +1,78 @@
 """数据库连接和会话管理"""
 
+from sqlalchemy import event, inspect, make_url, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import StaticPool
 from typing import AsyncGenerator
 import os
 
+import orjson
+
 from app.models.base import Base
 from app.core.config import settings
 
-# 数据库文件路径
+# 数据库文件路径（未配置 DATABASE_URL 时使用数据目录下的SQLite数据库）
 DATABASE_PATH = os.path.join(settings.DATA_DIR, "dlflow.db")
-DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+if "DATABASE_URL" in settings.model_fields_set:
+    DATABASE_URL = settings.DATABASE_URL
+else:
+    DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+if IS_SQLITE:
+    connect_args = {
+        "check_same_thread": False,
+        # 复用已解析的语句，避免重复的SQL解析与查询计划生成
+        "cached_statements": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+else:
+    # asyncpg：服务端预编译语句缓存；经 PgBouncer 事务池连接时需将 DB_STATEMENT_CACHE_SIZE 设为0
+    connect_args = {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+def _json_dumps(value) -> str:
+    """JSON列序列化"""
+    return orjson.dumps(value).decode()
+
 
 # 创建异步数据库引擎
 engine = create_async_engine(
     DATABASE_URL,
     echo=settings.DEBUG,
-    poolclass=StaticPool,
-    connect_args={
-        "check_same_thread": False,
-    },
+    # 连接池按任务并发规模设置，避免协程在获取连接时排队
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    # 取出连接前检测可用性，丢弃已断开的连接
+    pool_pre_ping=True,
+    # 批量INSERT时每条语句合并的行数
+    insertmanyvalues_page_size=1000,
+    # SQLAlchemy 编译缓存与驱动层预编译语句缓存保持同一规模
+    query_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+    # JSON列（任务参数、结果等）使用 orjson 编解码，asyncpg 下同样作用于其JSON类型编解码器
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
+    connect_args=connect_args,
 )
 
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """为每个新连接设置SQLite性能参数"""
+    cursor = dbapi_connection.cursor()
+    # WAL模式允许读操作与调度器写入并发进行
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 # 创建异步会话工厂
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -30,10 +81,51 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def _add_missing_columns(sync_conn):
+    """为已存在的表补充模型中新增的可空列"""
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns or not column.nullable:
+                continue
+            
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(
+                text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            )
+
+
+def _create_missing_indexes(sync_conn):
+    """为已存在的表补建模型中新增的索引"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+def _normalize_task_created_at(sync_conn):
+    """SQLite：将默认值写入的整秒创建时间补齐为带微秒的存储格式，与游标参数按字符串比较一致"""
+    if "tasks" not in inspect(sync_conn).get_table_names():
+        return
+    sync_conn.execute(
+        text("UPDATE tasks SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+    )
+
+
 async def create_tables():
     """创建数据库表"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all 不会修改已存在的表，手动补充新增的列和索引
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        if IS_SQLITE:
+            await conn.run_sync(_normalize_task_created_at)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -51,9 +143,10 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 async def init_database():
     """初始化数据库"""
     # 确保数据目录存在
-    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+    if IS_SQLITE:
+        os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
     
     # 创建数据库表
     await create_tables()
     
-    print(f"数据库初始化完成: {DATABASE_PATH}")
\ No newline at end of file
+    print(f"数据库初始化完成: {engine.url.render_as_string(hide_password=True)}")
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, JSON, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import String, Text, JSON, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -12,6 +12,11 @@ class Execution(Base, TimestampMixin):
     """执行历史模型"""
     
     __tablename__ = "executions"
+    __table_args__ = (
+        # 覆盖按项目筛选并按创建时间排序的查询，前缀也可用于仅按项目筛选
+        Index("ix_exec_proj_created", "project_id", "created_at"),
+        Index("ix_executions_created_at", "created_at"),
+    )
     
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False)
@@ -31,6 +36,7 @@ class Execution(Base, TimestampMixin):
     project = relationship("Project", back_populates="executions")
     workflow = relationship("Workflow", back_populates="executions")
     steps = relationship("ExecutionStep", back_populates="execution", cascade="all, delete-orphan")
+    tasks = relationship("Task", back_populates="execution")
     
     def __repr__(self) -> str:
         return f"<Execution(id='{self.id}', name='{self.name}', status='{self.status}')>"
@@ -1,7 +1,7 @@
 """文件数据模型"""
 
 from typing import Optional
-from sqlalchemy import String, Text, Integer, ForeignKey
+from sqlalchemy import String, Text, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -11,6 +11,10 @@ class UploadedFile(Base, TimestampMixin):
     """上传文件模型"""
     
     __tablename__ = "uploaded_files"
+    __table_args__ = (
+        Index("ix_uploaded_files_project_id", "project_id"),
+        Index("ux_uploaded_files_project_sha256", "project_id", "content_sha256", unique=True),
+    )
     
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False)
@@ -22,6 +26,7 @@ class UploadedFile(Base, TimestampMixin):
     mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
     status: Mapped[str] = mapped_column(String(50), default="uploaded", nullable=False)  # uploaded, processing, processed, error
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    content_sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # 文件内容哈希，用于去重
     
     # 关联关系
     project = relationship("Project", back_populates="files")
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, JSON, Integer
+from sqlalchemy import String, Text, JSON, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -26,4 +26,8 @@ class Project(Base, TimestampMixin):
     files = relationship("UploadedFile", back_populates="project", cascade="all, delete-orphan")
     
     def __repr__(self) -> str:
-        return f"<Project(id='{self.id}', name='{self.name}', status='{self.status}')>"
\ No newline at end of file
+        return f"<Project(id='{self.id}', name='{self.name}', status='{self.status}')>"
+
+
+# 支持 list_projects 的 WHERE status + ORDER BY created_at DESC
+Index("ix_projects_status_created_at", Project.status, Project.created_at.desc())
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, JSON, Integer, DateTime, ForeignKey
+from sqlalchemy import String, Text, JSON, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -12,8 +12,18 @@ class Task(Base, TimestampMixin):
     """任务模型"""
     
     __tablename__ = "tasks"
+    __table_args__ = (
+        # 覆盖各筛选条件下按创建时间倒序的列表查询，前缀也可用于仅按该列筛选
+        Index("ix_tasks_exec_created", "execution_id", "created_at"),
+        Index("ix_tasks_status_created", "status", "created_at"),
+        Index("ix_tasks_type_created", "task_type", "created_at"),
+        Index("ix_tasks_created_at", "created_at"),
+    )
     
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    # 创建时间在Python端生成（精确到微秒）：SQLite 的 CURRENT_TIMESTAMP 只到秒，
+    # 存储格式与绑定参数不一致，游标分页按创建时间比较时会重复返回同一页
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
     execution_id: Mapped[Optional[str]] = mapped_column(String(36), ForeignKey("executions.id"), nullable=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     task_type: Mapped[str] = mapped_column(String(100), nullable=False)  # data_processing, analysis, visualization
@@ -29,7 +39,7 @@ class Task(Base, TimestampMixin):
     max_retries: Mapped[int] = mapped_column(Integer, default=3, nullable=False)
     
     # 关联关系
-    execution = relationship("Execution", foreign_keys=[execution_id])
+    execution = relationship("Execution", back_populates="tasks")
     
     def __repr__(self) -> str:
         return f"<Task(id='{self.id}', name='{self.name}', status='{self.status}')>"
\ No newline at end of file
@@ -13,7 +13,7 @@ class Workflow(Base, TimestampMixin):
     __tablename__ = "workflows"
     
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False)
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     version: Mapped[str] = mapped_column(String(50), default="1.0.0", nullable=False)
@@ -22,8 +22,9 @@ class Workflow(Base, TimestampMixin):
     
     # 关联关系
     project = relationship("Project", back_populates="workflows")
-    nodes = relationship("WorkflowNode", back_populates="workflow", cascade="all, delete-orphan")
-    edges = relationship("WorkflowEdge", back_populates="workflow", cascade="all, delete-orphan")
+    # 节点与连线总是随工作流一起使用，批量预加载避免 N+1 查询（异步会话中也无法惰性加载）
+    nodes = relationship("WorkflowNode", back_populates="workflow", cascade="all, delete-orphan", lazy="selectin")
+    edges = relationship("WorkflowEdge", back_populates="workflow", cascade="all, delete-orphan", lazy="selectin")
     executions = relationship("Execution", back_populates="workflow")
     
     def __repr__(self) -> str:
@@ -36,7 +37,7 @@ class WorkflowNode(Base, TimestampMixin):
     __tablename__ = "workflow_nodes"
     
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    workflow_id: Mapped[str] = mapped_column(String(36), ForeignKey("workflows.id"), nullable=False)
+    workflow_id: Mapped[str] = mapped_column(String(36), ForeignKey("workflows.id"), nullable=False, index=True)
     node_id: Mapped[str] = mapped_column(String(100), nullable=False)  # React Flow节点ID
     node_type: Mapped[str] = mapped_column(String(100), nullable=False)  # input, process, output, etc.
     label: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -57,7 +58,7 @@ class WorkflowEdge(Base, TimestampMixin):
     __tablename__ = "workflow_edges"
     
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    workflow_id: Mapped[str] = mapped_column(String(36), ForeignKey("workflows.id"), nullable=False)
+    workflow_id: Mapped[str] = mapped_column(String(36), ForeignKey("workflows.id"), nullable=False, index=True)
     edge_id: Mapped[str] = mapped_column(String(100), nullable=False)  # React Flow边ID
     source_node_id: Mapped[str] = mapped_column(String(100), nullable=False)
     target_node_id: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -1,11 +1,82 @@
 """数据处理服务模块"""
 
+import numpy as np
 import polars as pl
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Tuple
+from functools import reduce
+from operator import and_
+from typing import Dict, Any, Optional, List, Tuple, TypeVar
 
 from app.core.config import settings
 
+# 正则表达式元字符，contains 条件不含这些字符时按字面量匹配
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
+
+def _contains(col: pl.Expr, value: Any) -> pl.Expr:
+    """字符串包含条件，不含正则元字符时按字面量匹配，跳过正则编译"""
+    pattern = str(value)
+    return col.str.contains(pattern, literal=REGEX_METACHARACTERS.isdisjoint(pattern))
+
+
+def _is_in(col: pl.Expr, value: Any) -> Optional[pl.Expr]:
+    """成员条件，值不是列表时忽略该条件"""
+    if not isinstance(value, list):
+        return None
+    return col.is_in(pl.Series(value))
+
+
+# 过滤运算符 -> 条件表达式构造函数
+FILTER_OPERATORS = {
+    "==": lambda col, value: col == value,
+    "!=": lambda col, value: col != value,
+    ">": lambda col, value: col > value,
+    ">=": lambda col, value: col >= value,
+    "<": lambda col, value: col < value,
+    "<=": lambda col, value: col <= value,
+    "contains": _contains,
+    "in": _is_in,
+}
+
+# 聚合函数名 -> 聚合表达式
+AGGREGATIONS = {
+    "sum": pl.Expr.sum,
+    "mean": pl.Expr.mean,
+    "count": pl.Expr.count,
+    "min": pl.Expr.min,
+    "max": pl.Expr.max,
+}
+
+# 同时适用于 DataFrame 与 LazyFrame 的处理函数类型
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
+
+# analyze_variables 未传入 time_info 时的占位值（None 表示已检测且无时间列）
+_UNSET: Any = object()
+
+# 唯一值比例低于该值的字符串列视为分类变量
+CATEGORICAL_RATIO = 0.5
+
+# 近似唯一值数与判定阈值的相对差距在该范围内时重新精确计算
+APPROX_UNIQUE_MARGIN = 0.1
+
+def _strptime_tagtime(values):
+    """按 TAGTIME_FORMAT 解析tagTime字符串（Series或表达式），无效值为空
+    
+    Polars 不接受只有小时没有分钟的格式，补齐分钟后再解析
+    """
+    return (values + "00").str.strptime(pl.Datetime, f"{settings.TAGTIME_FORMAT}%M", strict=False)
+
+
+# 视为数值变量的列类型
+NUMERIC_DTYPES = frozenset({
+    pl.Int8, pl.Int16, pl.Int32, pl.Int64,
+    pl.UInt8, pl.UInt16, pl.UInt32, pl.UInt64,
+    pl.Float32, pl.Float64,
+})
+
+# 汇总统计信息包含的统计量（按输出顺序）
+SUMMARY_STATISTICS = ("count", "mean", "std", "min", "q25", "median", "q75", "max", "null_count")
+
 
 class DataProcessor:
     """数据处理器"""
@@ -24,8 +95,8 @@ class DataProcessor:
             column_type = "datetime" if first_column == "DateTime" else "tagtime"
             
             # 验证数据格式
-            sample_values = df[first_column].head(10).to_list()
-            valid_format = DataProcessor._validate_time_format(sample_values, column_type)
+            sample = df.get_column(first_column).head(10)
+            valid_format = DataProcessor._validate_time_format(sample, column_type)
             
             if valid_format:
                 return {
@@ -38,116 +109,145 @@ class DataProcessor:
         return None
     
     @staticmethod
-    def _validate_time_format(values: List[Any], column_type: str) -> bool:
-        """验证时间格式"""
+    def _validate_time_format(sample: pl.Series, column_type: str) -> bool:
+        """验证时间格式，样本在Polars内解析，原为空值之外的样本全部解析成功才视为有效"""
         try:
-            for value in values:
-                if value is None:
-                    continue
-                
-                if column_type == "datetime":
-                    # 验证标准日期时间格式
-                    datetime.strptime(str(value), settings.DATETIME_FORMAT)
-                elif column_type == "tagtime":
-                    # 验证tagTime格式 (YYYYMMDDHH)
-                    value_str = str(value)
-                    if len(value_str) != 10 or not value_str.isdigit():
-                        return False
-                    
-                    # 尝试解析为日期时间
-                    year = int(value_str[:4])
-                    month = int(value_str[4:6])
-                    day = int(value_str[6:8])
-                    hour = int(value_str[8:10])
-                    
-                    # 验证日期时间的有效性
-                    datetime(year, month, day, hour)
+            if column_type == "datetime":
+                # 已是日期/时间类型的列（如parquet输入）无需解析
+                if sample.dtype.is_temporal():
+                    return True
+                if sample.dtype != pl.Utf8:
+                    return False
+                parsed = sample.str.strptime(pl.Datetime, settings.DATETIME_FORMAT, strict=False)
+            elif column_type == "tagtime":
+                # tagTime格式 (YYYYMMDDHH)，与 parse_time_column 相同的转换方式
+                values = sample
+                if sample.dtype != pl.Utf8:
+                    values = sample.cast(pl.Int64, strict=False).cast(pl.Utf8)
+                if values.str.contains(r"^\d{10}$").not_().any():
+                    return False
+                parsed = _strptime_tagtime(values)
+            else:
+                return True
             
-            return True
-        except (ValueError, TypeError):
+            # 无法解析或日期时间无效的值在 strict=False 下变为空值
+            return parsed.null_count() == sample.null_count()
+        except pl.exceptions.PolarsError:
             return False
     
     @staticmethod
-    def parse_time_column(df: pl.DataFrame, time_info: Dict[str, Any]) -> pl.DataFrame:
-        """解析时间列"""
+    def parse_time_column(df: FrameT, time_info: Dict[str, Any]) -> FrameT:
+        """解析时间列，支持 DataFrame 与 LazyFrame"""
         column_name = time_info["column_name"]
         column_type = time_info["column_type"]
         
         if column_type == "datetime":
-            # 标准日期时间格式，直接转换
-            df = df.with_columns(
-                pl.col(column_name).str.strptime(pl.Datetime, settings.DATETIME_FORMAT)
-            )
+            # 字符串列按标准日期时间格式转换，已是日期/时间类型的列统一为Datetime
+            if df.collect_schema()[column_name].is_temporal():
+                values = pl.col(column_name).cast(pl.Datetime)
+            else:
+                values = pl.col(column_name).str.strptime(pl.Datetime, settings.DATETIME_FORMAT)
+            df = df.with_columns(values)
         elif column_type == "tagtime":
-            # tagTime格式，需要特殊处理
+            # tagTime格式 (YYYYMMDDHH)，数值列先转为字符串，全部在Polars内部向量化解析
+            values = pl.col(column_name)
+            if df.collect_schema()[column_name] != pl.Utf8:
+                values = values.cast(pl.Int64, strict=False).cast(pl.Utf8)
+            
+            # 与 _parse_tagtime 一致：非10位数字或无效日期时间解析为空值
             df = df.with_columns(
-                pl.col(column_name).map_elements(
-                    lambda x: DataProcessor._parse_tagtime(x),
-                    return_dtype=pl.Datetime
-                )
+                pl.when(values.str.contains(r"^\d{10}$"))
+                .then(_strptime_tagtime(values))
+                .otherwise(None)
+                .alias(column_name)
             )
         
         return df
     
     @staticmethod
     def _parse_tagtime(value: Any) -> Optional[datetime]:
-        """解析tagTime格式"""
+        """解析单个tagTime值（供标量调用方使用，列解析见 parse_time_column）"""
         try:
             if value is None:
                 return None
             
             value_str = str(value)
-            if len(value_str) != 10 or not value_str.isdigit():
+            if len(value_str) != 10 or not value_str.isascii() or not value_str.isdigit():
                 return None
             
-            year = int(value_str[:4])
-            month = int(value_str[4:6])
-            day = int(value_str[6:8])
-            hour = int(value_str[8:10])
+            # 直接按ASCII码计算各字段，省去切片与 int() 转换
+            d = value_str.encode()
+            year = d[0] * 1000 + d[1] * 100 + d[2] * 10 + d[3] - 53328
+            month = d[4] * 10 + d[5] - 528
+            day = d[6] * 10 + d[7] - 528
+            hour = d[8] * 10 + d[9] - 528
             
             return datetime(year, month, day, hour)
         except (ValueError, TypeError):
             return None
     
     @staticmethod
-    def analyze_variables(df: pl.DataFrame, exclude_time_column: bool = True) -> Dict[str, Any]:
-        """分析变量"""
+    def analyze_variables(
+        df: pl.DataFrame,
+        exclude_time_column: bool = True,
+        time_info: Optional[Dict[str, Any]] = _UNSET
+    ) -> Dict[str, Any]:
+        """分析变量，time_info 为调用方已检测的时间列信息（可为None），未传入时重新检测"""
         columns = df.columns
         
         # 排除时间列
         if exclude_time_column and len(columns) > 0:
             # 检测时间列
-            time_info = DataProcessor.detect_time_column(df)
+            if time_info is _UNSET:
+                time_info = DataProcessor.detect_time_column(df)
             if time_info:
                 columns = [col for col in columns if col != time_info["column_name"]]
         
+        # 所有列的缺失值数与唯一值数在同一查询中计算，数据类型一次取出；
+        # 字符串列只用于分类/文本判断，先使用近似唯一值数
+        dtypes = dict(zip(df.columns, df.dtypes))
+        stats = df.select(
+            [pl.col(col).null_count().alias(f"null__{col}") for col in columns]
+            + [
+                (pl.col(col).approx_n_unique() if dtypes[col] == pl.Utf8 else pl.col(col).n_unique())
+                .alias(f"nunique__{col}")
+                for col in columns
+            ]
+        ).row(0, named=True) if columns else {}
+        
         # 分析变量类型
         numeric_vars = []
         categorical_vars = []
         text_vars = []
         
         for col in columns:
-            dtype = df[col].dtype
+            dtype = dtypes[col]
+            null_count = stats[f"null__{col}"]
+            unique_count = stats[f"nunique__{col}"]
             
-            if dtype in [pl.Int64, pl.Float64, pl.Int32, pl.Float32, pl.Int16, pl.Int8]:
+            if dtype in NUMERIC_DTYPES:
                 numeric_vars.append({
                     "name": col,
                     "type": "numeric",
                     "dtype": str(dtype),
-                    "null_count": df[col].null_count(),
-                    "unique_count": df[col].n_unique()
+                    "null_count": null_count,
+                    "unique_count": unique_count
                 })
             elif dtype == pl.Utf8:
-                unique_count = df[col].n_unique()
                 total_count = df.height
                 
+                # 近似值接近判定阈值时改用精确唯一值数
+                threshold = CATEGORICAL_RATIO * total_count
+                if abs(unique_count - threshold) <= APPROX_UNIQUE_MARGIN * threshold:
+                    unique_count = df[col].n_unique()
+                
                 # 如果唯一值比例小于0.5，认为是分类变量
-                if unique_count / total_count < 0.5:
+                if unique_count / total_count < CATEGORICAL_RATIO:
                     categorical_vars.append({
                         "name": col,
                         "type": "categorical",
                         "dtype": str(dtype),
-                        "null_count": df[col].null_count(),
+                        "null_count": null_count,
                         "unique_count": unique_count
                     })
                 else:
@@ -155,7 +255,7 @@ class DataProcessor:
                         "name": col,
                         "type": "text",
                         "dtype": str(dtype),
-                        "null_count": df[col].null_count(),
+                        "null_count": null_count,
                         "unique_count": unique_count
                     })
             else:
@@ -164,8 +264,8 @@ class DataProcessor:
                     "name": col,
                     "type": "other",
                     "dtype": str(dtype),
-                    "null_count": df[col].null_count(),
-                    "unique_count": df[col].n_unique()
+                    "null_count": null_count,
+                    "unique_count": unique_count
                 })
         
         return {
@@ -189,21 +289,25 @@ class DataProcessor:
         try:
             # 选择数值列并计算相关性矩阵
             numeric_df = df.select(numeric_columns)
+            rows, cols = np.triu_indices(len(numeric_columns), 1)  # 只取上三角矩阵
+            
+            if numeric_df.null_count().sum_horizontal().item() == 0:
+                # 无缺失值时一次计算完整的相关性矩阵
+                values = numeric_df.corr().to_numpy()[rows, cols]
+            else:
+                # 存在缺失值时保持逐对剔除缺失值的口径，所有变量对在同一查询中计算
+                values = numeric_df.select([
+                    pl.corr(numeric_columns[i], numeric_columns[j]).alias(str(k))
+                    for k, (i, j) in enumerate(zip(rows, cols))
+                ]).row(0)
             
-            # 使用Polars计算相关性
             correlations = []
-            for i, col1 in enumerate(numeric_columns):
-                for j, col2 in enumerate(numeric_columns):
-                    if i < j:  # 只计算上三角矩阵
-                        corr = numeric_df.select(
-                            pl.corr(col1, col2).alias("correlation")
-                        ).item()
-                        
-                        correlations.append({
-                            "variable1": col1,
-                            "variable2": col2,
-                            "correlation": round(corr, 4) if corr is not None else None
-                        })
+            for i, j, corr in zip(rows, cols, values):
+                correlations.append({
+                    "variable1": numeric_columns[i],
+                    "variable2": numeric_columns[j],
+                    "correlation": round(float(corr), 4) if corr is not None and np.isfinite(corr) else None
+                })
             
             return {
                 "correlations": correlations,
@@ -220,27 +324,32 @@ class DataProcessor:
     def generate_summary_statistics(df: pl.DataFrame, numeric_columns: List[str]) -> Dict[str, Any]:
         """生成汇总统计信息"""
         try:
-            statistics = {}
-            
+            # 所有列的全部统计量在同一查询中计算，浮点结果在Polars内保留4位小数
+            schema = df.schema
+            exprs = []
             for col in numeric_columns:
-                col_stats = df.select([
-                    pl.col(col).count().alias("count"),
-                    pl.col(col).mean().alias("mean"),
-                    pl.col(col).std().alias("std"),
-                    pl.col(col).min().alias("min"),
-                    pl.col(col).quantile(0.25).alias("q25"),
-                    pl.col(col).median().alias("median"),
-                    pl.col(col).quantile(0.75).alias("q75"),
-                    pl.col(col).max().alias("max"),
-                    pl.col(col).null_count().alias("null_count")
-                ]).to_dicts()[0]
-                
-                # 格式化数值
-                for key, value in col_stats.items():
-                    if value is not None and isinstance(value, (int, float)):
-                        col_stats[key] = round(value, 4)
-                
-                statistics[col] = col_stats
+                # 最小值与最大值沿用列类型，仅浮点列需要取整
+                is_float = schema[col].is_float()
+                col_min = pl.col(col).min()
+                col_max = pl.col(col).max()
+                exprs.extend([
+                    pl.col(col).count().alias(f"{col}__count"),
+                    pl.col(col).mean().round(4).alias(f"{col}__mean"),
+                    pl.col(col).std().round(4).alias(f"{col}__std"),
+                    (col_min.round(4) if is_float else col_min).alias(f"{col}__min"),
+                    pl.col(col).quantile(0.25).round(4).alias(f"{col}__q25"),
+                    pl.col(col).median().round(4).alias(f"{col}__median"),
+                    pl.col(col).quantile(0.75).round(4).alias(f"{col}__q75"),
+                    (col_max.round(4) if is_float else col_max).alias(f"{col}__max"),
+                    pl.col(col).null_count().alias(f"{col}__null_count")
+                ])
+            
+            row = df.select(exprs).row(0, named=True) if exprs else {}
+            
+            statistics = {
+                col: {key: row[f"{col}__{key}"] for key in SUMMARY_STATISTICS}
+                for col in numeric_columns
+            }
             
             return statistics
         
@@ -249,7 +358,8 @@ class DataProcessor:
     
     @staticmethod
     def filter_data(df: pl.DataFrame, filters: List[Dict[str, Any]]) -> pl.DataFrame:
-        """根据条件过滤数据"""
+        """根据条件过滤数据（所有条件合并为一个掩码，只过滤一次）"""
+        exprs = []
         for filter_condition in filters:
             column = filter_condition.get("column")
             operator = filter_condition.get("operator")
@@ -258,58 +368,36 @@ class DataProcessor:
             if not all([column, operator, value is not None]):
                 continue
             
-            if operator == "==":
-                df = df.filter(pl.col(column) == value)
-            elif operator == "!=":
-                df = df.filter(pl.col(column) != value)
-            elif operator == ">":
-                df = df.filter(pl.col(column) > value)
-            elif operator == ">=":
-                df = df.filter(pl.col(column) >= value)
-            elif operator == "<":
-                df = df.filter(pl.col(column) < value)
-            elif operator == "<=":
-                df = df.filter(pl.col(column) <= value)
-            elif operator == "contains":
-                df = df.filter(pl.col(column).str.contains(str(value)))
-            elif operator == "in":
-                if isinstance(value, list):
-                    df = df.filter(pl.col(column).is_in(value))
+            build = FILTER_OPERATORS.get(operator)
+            if build is None:
+                continue
+            
+            expr = build(pl.col(column), value)
+            if expr is not None:
+                exprs.append(expr)
         
-        return df
+        if not exprs:
+            return df
+        return df.filter(reduce(and_, exprs))
     
     @staticmethod
     def aggregate_data(df: pl.DataFrame, group_by: List[str], aggregations: Dict[str, str]) -> pl.DataFrame:
         """聚合数据"""
+        items = [
+            (column, agg_func)
+            for column, agg_func in aggregations.items()
+            if agg_func in AGGREGATIONS
+        ]
+        
         if not group_by:
-            # 全局聚合
-            agg_exprs = []
-            for column, agg_func in aggregations.items():
-                if agg_func == "sum":
-                    agg_exprs.append(pl.col(column).sum().alias(f"{column}_sum"))
-                elif agg_func == "mean":
-                    agg_exprs.append(pl.col(column).mean().alias(f"{column}_mean"))
-                elif agg_func == "count":
-                    agg_exprs.append(pl.col(column).count().alias(f"{column}_count"))
-                elif agg_func == "min":
-                    agg_exprs.append(pl.col(column).min().alias(f"{column}_min"))
-                elif agg_func == "max":
-                    agg_exprs.append(pl.col(column).max().alias(f"{column}_max"))
-            
-            return df.select(agg_exprs)
+            # 全局聚合，结果列名带聚合函数后缀
+            return df.select([
+                AGGREGATIONS[agg_func](pl.col(column)).alias(f"{column}_{agg_func}")
+                for column, agg_func in items
+            ])
         else:
-            # 分组聚合
-            agg_exprs = []
-            for column, agg_func in aggregations.items():
-                if agg_func == "sum":
-                    agg_exprs.append(pl.col(column).sum())
-                elif agg_func == "mean":
-                    agg_exprs.append(pl.col(column).mean())
-                elif agg_func == "count":
-                    agg_exprs.append(pl.col(column).count())
-                elif agg_func == "min":
-                    agg_exprs.append(pl.col(column).min())
-                elif agg_func == "max":
-                    agg_exprs.append(pl.col(column).max())
-            
-            return df.group_by(group_by).agg(agg_exprs)
\ No newline at end of file
+            # 分组聚合，结果列沿用原列名
+            return df.group_by(group_by).agg([
+                AGGREGATIONS[agg_func](pl.col(column))
+                for column, agg_func in items
+            ])
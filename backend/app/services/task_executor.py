@@ -1,20 +1,32 @@
 """任务执行器模块"""
 
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import os
 import uuid
 import logging
 import traceback
 
-from app.database import get_db
-from app.models.task import Task
+import orjson
+
+from app.core.config import settings
+from app.core.scheduler import scheduler
+from app.core.storage import JSONStorage
 from app.models.execution import Execution, ExecutionStep
 from app.services.data_processor import DataProcessor
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 
+# 数据文件处理结果缓存: 指纹 -> 结果，按LRU淘汰；磁盘副本存放在临时目录下供其他进程复用
+PROCESS_CACHE_MAX_ENTRIES = 128
+# 磁盘缓存保留的最大文件数，超出时按修改时间删除最旧的文件
+PROCESS_DISK_CACHE_MAX_FILES = 512
+_process_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
 
 class TaskExecutor:
     """任务执行器"""
@@ -26,15 +38,16 @@ class TaskExecutor:
         processing_config: Dict[str, Any]
     ) -> Dict[str, Any]:
         """执行数据处理任务"""
+        # 开始时间随结束状态一并写入，running 状态由调度器按运行时长上报
+        start_time = datetime.now()
         try:
-            # 更新任务状态为运行中
-            await TaskExecutor._update_task_status(task_id, "running")
-            
             # 执行数据处理
             result = await TaskExecutor._process_data_file(file_path, processing_config)
             
             # 更新任务状态为完成
-            await TaskExecutor._update_task_status(task_id, "completed", result=result)
+            await TaskExecutor._update_task_status(
+                task_id, "completed", result=result, start_time=start_time
+            )
             
             return result
             
@@ -43,7 +56,9 @@ class TaskExecutor:
             logger.error(error_msg)
             
             # 更新任务状态为失败
-            await TaskExecutor._update_task_status(task_id, "failed", error_message=error_msg)
+            await TaskExecutor._update_task_status(
+                task_id, "failed", error_message=error_msg, start_time=start_time
+            )
             
             raise e
     
@@ -54,15 +69,16 @@ class TaskExecutor:
         analysis_config: Dict[str, Any]
     ) -> Dict[str, Any]:
         """执行数据分析任务"""
+        # 开始时间随结束状态一并写入，running 状态由调度器按运行时长上报
+        start_time = datetime.now()
         try:
-            # 更新任务状态为运行中
-            await TaskExecutor._update_task_status(task_id, "running")
-            
             # 执行数据分析
             result = await TaskExecutor._analyze_data(data_path, analysis_config)
             
             # 更新任务状态为完成
-            await TaskExecutor._update_task_status(task_id, "completed", result=result)
+            await TaskExecutor._update_task_status(
+                task_id, "completed", result=result, start_time=start_time
+            )
             
             return result
             
@@ -71,7 +87,9 @@ class TaskExecutor:
             logger.error(error_msg)
             
             # 更新任务状态为失败
-            await TaskExecutor._update_task_status(task_id, "failed", error_message=error_msg)
+            await TaskExecutor._update_task_status(
+                task_id, "failed", error_message=error_msg, start_time=start_time
+            )
             
             raise e
     
@@ -82,15 +100,16 @@ class TaskExecutor:
         chart_config: Dict[str, Any]
     ) -> Dict[str, Any]:
         """执行数据可视化任务"""
+        # 开始时间随结束状态一并写入，running 状态由调度器按运行时长上报
+        start_time = datetime.now()
         try:
-            # 更新任务状态为运行中
-            await TaskExecutor._update_task_status(task_id, "running")
-            
             # 执行数据可视化
             result = await TaskExecutor._create_visualization(data_path, chart_config)
             
             # 更新任务状态为完成
-            await TaskExecutor._update_task_status(task_id, "completed", result=result)
+            await TaskExecutor._update_task_status(
+                task_id, "completed", result=result, start_time=start_time
+            )
             
             return result
             
@@ -99,37 +118,111 @@ class TaskExecutor:
             logger.error(error_msg)
             
             # 更新任务状态为失败
-            await TaskExecutor._update_task_status(task_id, "failed", error_message=error_msg)
+            await TaskExecutor._update_task_status(
+                task_id, "failed", error_message=error_msg, start_time=start_time
+            )
             
             raise e
     
+    @staticmethod
+    def _fingerprint(file_path: str, config: Dict[str, Any]) -> Optional[str]:
+        """由文件路径、修改时间、大小与处理配置生成缓存指纹，文件不存在时返回None"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        
+        config_bytes = orjson.dumps(config, default=str, option=orjson.OPT_SORT_KEYS)
+        raw = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}|".encode() + config_bytes
+        return hashlib.sha256(raw).hexdigest()
+    
     @staticmethod
     async def _process_data_file(file_path: str, config: Dict[str, Any]) -> Dict[str, Any]:
-        """处理数据文件"""
+        """处理数据文件，文件内容与配置未变化时直接返回缓存结果"""
+        fingerprint = TaskExecutor._fingerprint(file_path, config)
+        if fingerprint is None:
+            return await asyncio.to_thread(TaskExecutor._analyze_data_file, file_path, config)
+        
+        # 进程内缓存
+        result = _process_cache.get(fingerprint)
+        if result is not None:
+            _process_cache.move_to_end(fingerprint)
+            return result
+        
+        # 磁盘缓存（写入经临时文件原子替换，其他进程不会读到写了一半的结果）
+        cache_dir = os.path.join(settings.TEMP_DIR, "process_cache")
+        cache_file = os.path.join(cache_dir, f"{fingerprint}.json")
+        result = await JSONStorage.aload_json(cache_file)
+        if result is None:
+            result = await asyncio.to_thread(TaskExecutor._analyze_data_file, file_path, config)
+            if await JSONStorage.asave_json(cache_file, result):
+                await asyncio.to_thread(TaskExecutor._prune_disk_cache, cache_dir)
+        
+        _process_cache[fingerprint] = result
+        while len(_process_cache) > PROCESS_CACHE_MAX_ENTRIES:
+            _process_cache.popitem(last=False)
+        return result
+    
+    @staticmethod
+    def _prune_disk_cache(cache_dir: str):
+        """磁盘缓存文件数超过上限时删除修改时间最早的文件"""
+        try:
+            with os.scandir(cache_dir) as it:
+                entries = [
+                    (entry.stat().st_mtime_ns, entry.path)
+                    for entry in it
+                    if entry.is_file() and entry.name.endswith(".json")
+                ]
+        except OSError:
+            return
+        
+        excess = len(entries) - PROCESS_DISK_CACHE_MAX_FILES
+        if excess <= 0:
+            return
+        
+        entries.sort()
+        for _, path in entries[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    @staticmethod
+    def _analyze_data_file(file_path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """读取并分析数据文件（同步执行，由调用方放入线程池以免阻塞事件循环）"""
         import polars as pl
         
-        # 读取数据文件
+        # 惰性扫描数据文件，时间列检测只读取首列的前几行
         if file_path.endswith('.csv'):
-            df = pl.read_csv(file_path)
+            lf = pl.scan_csv(file_path)
         elif file_path.endswith('.parquet'):
-            df = pl.read_parquet(file_path)
+            lf = pl.scan_parquet(file_path)
         else:
             raise ValueError(f"不支持的文件格式: {file_path}")
         
         # 检测时间列
-        time_info = DataProcessor.detect_time_column(df)
+        columns = lf.collect_schema().names()
+        time_info = None
+        if columns:
+            sample = lf.select(columns[0]).head(10).collect()
+            time_info = DataProcessor.detect_time_column(sample)
         
-        # 解析时间列
+        # 解析时间列（并入读取计划，一次扫描完成）
         if time_info:
-            df = DataProcessor.parse_time_column(df, time_info)
+            lf = DataProcessor.parse_time_column(lf, time_info)
+        
+        df = lf.collect()
         
         # 分析变量
-        variable_analysis = DataProcessor.analyze_variables(df)
+        variable_analysis = DataProcessor.analyze_variables(df, time_info=time_info)
         
         # 计算相关性（如果有数值变量）
         correlations = {}
         numeric_vars = [var["name"] for var in variable_analysis["numeric_variables"]]
         if len(numeric_vars) >= 2:
+            # 可选以 float32 精度计算，减半内存带宽
+            if config.get("precision") == "fp32":
+                df = df.with_columns([pl.col(col).cast(pl.Float32) for col in numeric_vars])
             correlations = DataProcessor.calculate_correlations(df, numeric_vars)
         
         return {
@@ -171,33 +264,23 @@ class TaskExecutor:
         task_id: str,
         status: str,
         result: Optional[Dict[str, Any]] = None,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        start_time: Optional[datetime] = None
     ):
-        """更新任务状态"""
-        try:
-            async for db in get_db():
-                # 获取任务
-                task_result = await db.execute(select(Task).where(Task.id == task_id))
-                task = task_result.scalar_one_or_none()
-                
-                if task:
-                    # 更新任务状态
-                    task.status = status
-                    
-                    if status == "running":
-                        task.start_time = datetime.now()
-                    elif status in ["completed", "failed"]:
-                        task.end_time = datetime.now()
-                    
-                    if result:
-                        task.result = result
-                    
-                    if error_message:
-                        task.error_message = error_message
-                    
-                    await db.commit()
-                
-                break
-                
-        except Exception as e:
-            logger.error(f"更新任务状态失败: {task_id}, 错误: {e}")
\ No newline at end of file
+        """更新任务状态，调度器写入协程运行时交由其批量落库，否则直接写库"""
+        values: Dict[str, Any] = {"status": status}
+        
+        if status == "running":
+            values["start_time"] = start_time or datetime.now()
+        elif status in ["completed", "failed"]:
+            values["end_time"] = datetime.now()
+            if start_time:
+                values["start_time"] = start_time
+        
+        if result:
+            values["result"] = result
+        
+        if error_message:
+            values["error_message"] = error_message
+        
+        await scheduler.record_task_update(task_id, values)
\ No newline at end of file
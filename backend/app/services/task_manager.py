@@ -1,21 +1,52 @@
 """任务管理服务模块"""
 
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
-import uuid
+from typing import Dict, Any, Optional, List, Tuple
+import asyncio
 import logging
+import time
 
-from app.database import get_db
+from app.core.config import settings
+from app.database import AsyncSessionLocal
 from app.models.task import Task
 from app.models.execution import Execution, ExecutionStep
 from app.core.scheduler import scheduler
 from app.services.task_executor import TaskExecutor
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
-from sqlalchemy.orm import selectinload
+from sqlalchemy import delete, func, insert, literal, select, tuple_, union_all, update
+from uuid_utils.compat import uuid7
 
 logger = logging.getLogger(__name__)
 
+# 任务类型 -> (执行函数, 数据路径参数名, 配置参数名)
+TASK_DISPATCH = {
+    "data_processing": (TaskExecutor.execute_data_processing_task, "file_path", "processing_config"),
+    "analysis": (TaskExecutor.execute_analysis_task, "data_path", "analysis_config"),
+    "visualization": (TaskExecutor.execute_visualization_task, "data_path", "chart_config"),
+}
+
+# 任务列表返回的列（不含 parameters/result/error_message 等大字段）
+TASK_LIST_COLUMNS = (
+    Task.id,
+    Task.execution_id,
+    Task.name,
+    Task.task_type,
+    Task.status,
+    Task.priority,
+    Task.scheduled_time,
+    Task.start_time,
+    Task.end_time,
+    Task.retry_count,
+    Task.created_at,
+    Task.updated_at,
+)
+
+# 任务统计结果缓存时长（秒），轮询的仪表盘在窗口内直接读取内存结果
+STATISTICS_CACHE_TTL = 2.0
+# (统计结果, 过期时间)；锁保证缓存失效时只有一个协程查询数据库
+_statistics_cache: Optional[Tuple[Dict[str, Any], float]] = None
+_statistics_lock = asyncio.Lock()
+
 
 class TaskManager:
     """任务管理器"""
@@ -30,9 +61,10 @@ class TaskManager:
         priority: int = 0
     ) -> str:
         """创建任务"""
-        task_id = str(uuid.uuid4())
+        # 按时间有序的UUIDv7，新任务写入主键索引的尾部
+        task_id = str(uuid7())
         
-        async for db in get_db():
+        async with AsyncSessionLocal() as db, db.begin():
             # 创建任务记录
             task = Task(
                 id=task_id,
@@ -46,42 +78,64 @@ class TaskManager:
             )
             
             db.add(task)
-            await db.commit()
-            
-            # 添加到调度器
-            await TaskManager._schedule_task(task)
-            
+        
+        # 事务提交后再添加到调度器，调度失败时的状态更新使用独立会话
+        await TaskManager._schedule_task(task)
+        
+        if logger.isEnabledFor(logging.INFO):
             logger.info(f"任务已创建: {task_id} - {name}")
-            return task_id
+        return task_id
+    
+    @staticmethod
+    async def create_tasks(specs: List[Dict[str, Any]]) -> List[str]:
+        """批量创建任务：所有记录在一条批量INSERT中写入并一次提交，再逐个添加到调度器
+        
+        每个任务描述包含 name、task_type、parameters，可选 execution_id、scheduled_time、priority
+        """
+        rows = [
+            {
+                "id": str(uuid7()),
+                "execution_id": spec.get("execution_id"),
+                "name": spec["name"],
+                "task_type": spec["task_type"],
+                "parameters": spec["parameters"],
+                "scheduled_time": spec.get("scheduled_time"),
+                "priority": spec.get("priority", 0),
+                "status": "pending"
+            }
+            for spec in specs
+        ]
+        if not rows:
+            return []
+        
+        async with AsyncSessionLocal() as db, db.begin():
+            await db.execute(insert(Task), rows)
+        
+        # 调度只需要任务的标识、类型、参数与计划时间，无需重新查询
+        for row in rows:
+            await TaskManager._schedule_task(Task(**row))
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"批量创建任务: {len(rows)} 个")
+        return [row["id"] for row in rows]
+    
+    @staticmethod
+    def _job_for(task) -> Tuple[Any, tuple]:
+        """根据任务类型确定执行函数及其参数（task 可为ORM对象或查询行）"""
+        entry = TASK_DISPATCH.get(task.task_type)
+        if entry is None:
+            raise ValueError(f"不支持的任务类型: {task.task_type}")
+        
+        func, path_key, config_key = entry
+        parameters = task.parameters
+        return func, (task.id, parameters.get(path_key), parameters.get(config_key, {}))
     
     @staticmethod
     async def _schedule_task(task: Task):
         """调度任务"""
         try:
             # 根据任务类型选择执行函数
-            if task.task_type == "data_processing":
-                func = TaskExecutor.execute_data_processing_task
-                args = (
-                    task.id,
-                    task.parameters.get("file_path"),
-                    task.parameters.get("processing_config", {})
-                )
-            elif task.task_type == "analysis":
-                func = TaskExecutor.execute_analysis_task
-                args = (
-                    task.id,
-                    task.parameters.get("data_path"),
-                    task.parameters.get("analysis_config", {})
-                )
-            elif task.task_type == "visualization":
-                func = TaskExecutor.execute_visualization_task
-                args = (
-                    task.id,
-                    task.parameters.get("data_path"),
-                    task.parameters.get("chart_config", {})
-                )
-            else:
-                raise ValueError(f"不支持的任务类型: {task.task_type}")
+            func, args = TaskManager._job_for(task)
             
             # 添加到调度器
             await scheduler.add_task(
@@ -96,27 +150,60 @@ class TaskManager:
             # 更新任务状态为失败
             await TaskManager._update_task_status(task.id, "failed", str(e))
     
+    @staticmethod
+    async def restore_pending_tasks() -> int:
+        """启动时将数据库中待执行的任务重新加入调度器：一次查询取出全部任务后批量注册"""
+        # 作业存储在进程内存中，多进程时每个进程都会恢复同一批任务并重复执行
+        if settings.WORKERS > 1 and not settings.DEBUG:
+            logger.warning("多进程部署，跳过待执行任务的恢复")
+            return 0
+        
+        async with AsyncSessionLocal() as db, db.begin():
+            result = await db.execute(
+                select(Task.id, Task.task_type, Task.parameters, Task.scheduled_time)
+                # 仅恢复由 TaskManager 调度的任务类型；其他类型（如工作流执行记录）由各自的入口管理
+                .where(Task.status == "pending", Task.task_type.in_(list(TASK_DISPATCH)))
+            )
+            rows = result.all()
+        
+        now = datetime.now()
+        specs = []
+        for row in rows:
+            func, args = TaskManager._job_for(row)
+            # 计划时间已过的任务立即执行，避免被当作错过执行而丢弃
+            run_date = row.scheduled_time if row.scheduled_time and row.scheduled_time > now else None
+            specs.append((row.id, func, args, run_date))
+        
+        failed = await scheduler.add_tasks_bulk(specs)
+        for task_id in failed:
+            await TaskManager._update_task_status(task_id, "failed", "恢复调度失败")
+        
+        restored = len(specs) - len(failed)
+        if restored and logger.isEnabledFor(logging.INFO):
+            logger.info(f"已恢复待执行任务: {restored} 个")
+        return restored
+    
     @staticmethod
     async def cancel_task(task_id: str) -> bool:
-        """取消任务"""
+        """取消任务（仅待执行或运行中的任务可取消）"""
         try:
-            async for db in get_db():
-                # 获取任务
-                result = await db.execute(select(Task).where(Task.id == task_id))
-                task = result.scalar_one_or_none()
+            async with AsyncSessionLocal() as db, db.begin():
+                # 状态检查与更新在同一条UPDATE中完成
+                result = await db.execute(
+                    update(Task)
+                    .where(Task.id == task_id, Task.status.in_(("pending", "running")))
+                    .values(status="cancelled", end_time=datetime.now())
+                )
                 
-                if not task:
+                if result.rowcount != 1:
                     return False
-                
-                # 从调度器中移除
-                await scheduler.remove_task(task_id)
-                
-                # 更新任务状态
-                task.status = "cancelled"
-                await db.commit()
-                
+            
+            # 从调度器中移除
+            await scheduler.remove_task(task_id)
+            
+            if logger.isEnabledFor(logging.INFO):
                 logger.info(f"任务已取消: {task_id}")
-                return True
+            return True
                 
         except Exception as e:
             logger.error(f"取消任务失败: {task_id}, 错误: {e}")
@@ -126,30 +213,26 @@ class TaskManager:
     async def retry_task(task_id: str) -> bool:
         """重试任务"""
         try:
-            async for db in get_db():
-                # 获取任务
-                result = await db.execute(select(Task).where(Task.id == task_id))
+            async with AsyncSessionLocal() as db, db.begin():
+                # 重试次数检查与更新在同一条UPDATE中原子完成，并返回更新后的任务用于重新调度
+                result = await db.execute(
+                    update(Task)
+                    .where(Task.id == task_id, Task.retry_count < Task.max_retries)
+                    .values(retry_count=Task.retry_count + 1, status="pending", error_message=None)
+                    .returning(Task)
+                )
                 task = result.scalar_one_or_none()
                 
                 if not task:
+                    logger.warning(f"任务不存在或重试次数已达上限: {task_id}")
                     return False
-                
-                # 检查重试次数
-                if task.retry_count >= task.max_retries:
-                    logger.warning(f"任务重试次数已达上限: {task_id}")
-                    return False
-                
-                # 更新重试次数和状态
-                task.retry_count += 1
-                task.status = "pending"
-                task.error_message = None
-                await db.commit()
-                
-                # 重新调度
-                await TaskManager._schedule_task(task)
-                
+            
+            # 事务提交后重新调度
+            await TaskManager._schedule_task(task)
+            
+            if logger.isEnabledFor(logging.INFO):
                 logger.info(f"任务已重试: {task_id} (第{task.retry_count}次)")
-                return True
+            return True
                 
         except Exception as e:
             logger.error(f"重试任务失败: {task_id}, 错误: {e}")
@@ -159,12 +242,9 @@ class TaskManager:
     async def get_task(task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务详情"""
         try:
-            async for db in get_db():
-                result = await db.execute(
-                    select(Task)
-                    .options(selectinload(Task.execution))
-                    .where(Task.id == task_id)
-                )
+            async with AsyncSessionLocal() as db, db.begin():
+                # 返回结果只包含任务自身的列，无需加载关联的执行记录
+                result = await db.execute(select(Task).where(Task.id == task_id))
                 task = result.scalar_one_or_none()
                 
                 if task:
@@ -199,12 +279,15 @@ class TaskManager:
         status: Optional[str] = None,
         task_type: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        after: Optional[datetime] = None,
+        after_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """列出任务"""
+        """列出任务；传入 after（上一页最后一条的创建时间，可附带其ID）时按游标分页，忽略 offset"""
         try:
-            async for db in get_db():
-                query = select(Task)
+            async with AsyncSessionLocal() as db, db.begin():
+                # 只查询列表需要的列，直接返回行数据而不构建ORM对象
+                query = select(*TASK_LIST_COLUMNS)
                 
                 # 添加过滤条件
                 if execution_id:
@@ -214,29 +297,19 @@ class TaskManager:
                 if task_type:
                     query = query.where(Task.task_type == task_type)
                 
-                # 添加排序和分页
-                query = query.order_by(Task.created_at.desc()).limit(limit).offset(offset)
+                # 添加排序和分页；游标分页直接从索引定位，无需扫描并丢弃前 offset 行
+                query = query.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit)
+                if after is not None:
+                    if after_id is not None:
+                        # 创建时间相同的任务按ID区分
+                        query = query.where(tuple_(Task.created_at, Task.id) < tuple_(after, after_id))
+                    else:
+                        query = query.where(Task.created_at < after)
+                else:
+                    query = query.offset(offset)
                 
                 result = await db.execute(query)
-                tasks = result.scalars().all()
-                
-                return [
-                    {
-                        "id": task.id,
-                        "execution_id": task.execution_id,
-                        "name": task.name,
-                        "task_type": task.task_type,
-                        "status": task.status,
-                        "priority": task.priority,
-                        "scheduled_time": task.scheduled_time,
-                        "start_time": task.start_time,
-                        "end_time": task.end_time,
-                        "retry_count": task.retry_count,
-                        "created_at": task.created_at,
-                        "updated_at": task.updated_at
-                    }
-                    for task in tasks
-                ]
+                return [dict(row) for row in result.mappings()]
                 
         except Exception as e:
             logger.error(f"列出任务失败, 错误: {e}")
@@ -246,15 +319,15 @@ class TaskManager:
     async def delete_task(task_id: str) -> bool:
         """删除任务"""
         try:
-            async for db in get_db():
+            async with AsyncSessionLocal() as db, db.begin():
                 # 先从调度器中移除
                 await scheduler.remove_task(task_id)
                 
                 # 从数据库中删除
                 await db.execute(delete(Task).where(Task.id == task_id))
-                await db.commit()
                 
-                logger.info(f"任务已删除: {task_id}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"任务已删除: {task_id}")
                 return True
                 
         except Exception as e:
@@ -263,25 +336,49 @@ class TaskManager:
     
     @staticmethod
     async def get_task_statistics() -> Dict[str, Any]:
-        """获取任务统计信息"""
+        """获取任务统计信息（短时缓存）"""
+        global _statistics_cache
+        
+        cached = _statistics_cache
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        
+        async with _statistics_lock:
+            # 等待锁期间其他协程可能已刷新缓存
+            cached = _statistics_cache
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            
+            stats = await TaskManager._query_task_statistics()
+            # 查询失败的空结果不缓存
+            if stats:
+                _statistics_cache = (stats, time.monotonic() + STATISTICS_CACHE_TTL)
+            return stats
+    
+    @staticmethod
+    async def _query_task_statistics() -> Dict[str, Any]:
+        """从数据库与调度器查询任务统计信息"""
         try:
-            async for db in get_db():
-                # 统计各状态的任务数量
-                result = await db.execute(
-                    select(Task.status, db.func.count(Task.id))
-                    .group_by(Task.status)
-                )
-                status_counts = dict(result.all())
-                
-                # 统计各类型的任务数量
-                result = await db.execute(
-                    select(Task.task_type, db.func.count(Task.id))
+            async with AsyncSessionLocal() as db, db.begin():
+                # 状态与类型两组计数合并为一条 UNION ALL 查询，与调度器作业列表并发获取
+                stmt = union_all(
+                    select(literal("status").label("kind"), Task.status.label("value"), func.count(Task.id))
+                    .group_by(Task.status),
+                    select(literal("type").label("kind"), Task.task_type.label("value"), func.count(Task.id))
                     .group_by(Task.task_type)
                 )
-                type_counts = dict(result.all())
+                result, scheduler_tasks = await asyncio.gather(
+                    db.execute(stmt),
+                    scheduler.list_tasks()
+                )
                 
-                # 获取调度器状态
-                scheduler_tasks = await scheduler.list_tasks()
+                status_counts = {}
+                type_counts = {}
+                for kind, value, count in result.all():
+                    if kind == "status":
+                        status_counts[value] = count
+                    else:
+                        type_counts[value] = count
                 
                 return {
                     "status_counts": status_counts,
@@ -298,7 +395,7 @@ class TaskManager:
     async def _update_task_status(task_id: str, status: str, error_message: str = None):
         """更新任务状态"""
         try:
-            async for db in get_db():
+            async with AsyncSessionLocal() as db, db.begin():
                 update_data = {"status": status}
                 
                 if status == "running":
@@ -314,7 +411,6 @@ class TaskManager:
                     .where(Task.id == task_id)
                     .values(**update_data)
                 )
-                await db.commit()
                 
         except Exception as e:
             logger.error(f"更新任务状态失败: {task_id}, 错误: {e}")
\ No newline at end of file
@@ -1,16 +1,20 @@
 import asyncio
-from app.database import get_db
+import sys
+from app.database import AsyncSessionLocal
 from app.models.project import Project
 from sqlalchemy import select
 
 async def check_projects():
-    async for db in get_db():
-        result = await db.execute(select(Project))
-        projects = result.scalars().all()
+    async with AsyncSessionLocal() as db:
+        # 流式读取，逐行输出而不一次性加载全部项目
+        projects = await db.stream_scalars(select(Project))
         print('Database projects:')
-        for p in projects:
+        async for p in projects:
             print(f'ID: {p.id}, Name: {p.name}')
-        break
 
 if __name__ == "__main__":
-    asyncio.run(check_projects())
\ No newline at end of file
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.run(check_projects())
+    else:
+        asyncio.run(check_projects())
\ No newline at end of file
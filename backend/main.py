@@ -1,17 +1,62 @@
 """FastAPI主应用程序入口点"""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import uvicorn
 import os
+import re
+import sys
 
 from app.api.routes import api_router
 from app.core.config import settings
 from app.core.storage import ensure_data_directories
 from app.database import init_database
 from app.core.scheduler import scheduler
+from app.services.task_manager import TaskManager
+
+
+# Vite 构建产物 [name]-[hash].ext 中紧邻扩展名的8位内容哈希（如 index-BkZz3a9X.js）；
+# 要求同时含数字与字母，避免 my-datasets.js、build-20240101.js 等普通文件名被长期缓存，
+# 未匹配的哈希文件只是退回协商缓存
+_HASHED_ASSET = re.compile(r"-(?=[0-9A-Za-z]*[0-9])(?=[0-9A-Za-z]*[A-Za-z])[0-9A-Za-z]{8}\.[0-9A-Za-z]+$")
+
+
+class CachedStaticFiles(StaticFiles):
+    """为静态文件添加缓存头：带内容哈希的文件长期缓存，其他文件每次协商验证"""
+    
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _HASHED_ASSET.search(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+class RequestSizeLimitMiddleware:
+    """根据Content-Length提前拒绝超大请求，避免读取请求体（纯ASGI实现，不包装请求体流）"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name != b"content-length":
+                    continue
+                if value.isdigit() and int(value) > settings.MAX_FILE_SIZE:
+                    response = ORJSONResponse(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        content={"detail": f"请求体大小超过限制: {settings.MAX_FILE_SIZE} bytes"}
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+        await self.app(scope, receive, send)
 
 
 @asynccontextmanager
@@ -21,6 +66,8 @@ async def lifespan(app: FastAPI):
     ensure_data_directories()
     await init_database()
     await scheduler.start()
+    # 重新调度上次运行时尚未执行的任务
+    await TaskManager.restore_pending_tasks()
     
     yield
     
@@ -33,21 +80,32 @@ app = FastAPI(
     title="DLFlow Backend",
     description="数据处理Web应用后端API",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # 默认使用 orjson 序列化响应
+    default_response_class=ORJSONResponse
 )
 
+# 根据Content-Length提前拒绝超大请求；先于CORS注册，413响应同样带有CORS响应头
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # 配置CORS中间件
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_HOSTS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # 显式列出接口实际使用的方法与请求头
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+    # 任务列表的下一页游标
+    expose_headers=["X-Next-After", "X-Next-After-Id", "X-Total-Count"],
 )
 
+# 压缩较大的响应（任务列表、工作流JSON等）
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # 挂载静态文件服务（如果目录存在）
 if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # 注册API路由
 app.include_router(api_router, prefix="/api")
@@ -71,5 +129,12 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        # 热重载与多进程不能同时使用
+        workers=1 if settings.DEBUG else settings.WORKERS,
+        # uvloop 不支持 Windows，此时交由 uvicorn 自动选择事件循环
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools",
+        # 访问日志逐请求格式化，仅在调试模式下开启
+        access_log=settings.DEBUG,
         log_level="info" if not settings.DEBUG else "debug"
     )
\ No newline at end of file
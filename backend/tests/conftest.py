@@ -0,0 +1,38 @@
+"""测试公共配置：数据目录指向临时目录，数据库使用其中的SQLite文件"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+
+# 必须在导入 app 之前设置，配置与数据库引擎在导入时确定
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="dlflow-test-")
+os.environ["DATA_DIR"] = TEST_DATA_DIR
+
+import pytest
+from sqlalchemy import delete
+
+from app.database import AsyncSessionLocal, engine, init_database
+from app.models.base import Base
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """创建数据库表，测试结束后删除临时数据目录"""
+    asyncio.run(init_database())
+    yield
+    asyncio.run(engine.dispose())
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    """每个测试开始前清空所有表"""
+    async def _clean():
+        async with AsyncSessionLocal() as db, db.begin():
+            for table in reversed(Base.metadata.sorted_tables):
+                await db.execute(delete(table))
+        # 连接不跨事件循环复用
+        await engine.dispose()
+
+    asyncio.run(_clean())
@@ -0,0 +1,111 @@
+"""文件上传去重测试"""
+
+import asyncio
+import io
+import os
+import uuid
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import func, select
+from starlette.datastructures import Headers
+
+from app.api.endpoints import files
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.file import UploadedFile
+from app.models.project import Project
+from app.services.task_manager import TaskManager
+
+CONTENT = b"DateTime,value\n2024-01-01 00:00:00,1\n"
+
+
+@pytest.fixture(autouse=True)
+def no_processing_task(monkeypatch):
+    """上传后不创建数据处理任务"""
+    async def create_task(**kwargs):
+        return None
+
+    monkeypatch.setattr(TaskManager, "create_task", staticmethod(create_task))
+
+
+def _upload_file(content=CONTENT, filename="data.csv"):
+    return UploadFile(
+        file=io.BytesIO(content),
+        filename=filename,
+        size=len(content),
+        headers=Headers({"content-type": "text/csv"}),
+    )
+
+
+async def _create_project():
+    project_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db, db.begin():
+        db.add(Project(id=project_id, name="test"))
+    return project_id
+
+
+async def _upload(project_id, content=CONTENT):
+    async with AsyncSessionLocal() as db:
+        return await files.upload_file(
+            project_id=project_id, description=None, file=_upload_file(content), db=db
+        )
+
+
+async def _file_count(project_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(func.count()).select_from(UploadedFile)
+            .where(UploadedFile.project_id == project_id)
+        )).scalar_one()
+
+
+def _stored_uploads():
+    return set(os.listdir(settings.UPLOAD_DIR))
+
+
+def test_upload_same_content_returns_existing_file():
+    async def run():
+        project_id = await _create_project()
+        first = await _upload(project_id)
+        uploads = _stored_uploads()
+        second = await _upload(project_id)
+        other = await _upload(project_id, content=CONTENT + b"2024-01-01 01:00:00,2\n")
+        return first, second, other, uploads, await _file_count(project_id)
+
+    first, second, other, uploads, count = asyncio.run(run())
+
+    assert second.id == first.id
+    assert other.id != first.id
+    assert count == 2
+    # 重复上传写入的文件已删除
+    assert uploads <= _stored_uploads()
+    assert len(_stored_uploads() - uploads) == 1
+
+
+def test_upload_duplicate_caught_by_unique_index(monkeypatch):
+    """去重查询未命中（并发上传）时由唯一索引拦截并返回先提交的记录"""
+    find_duplicate = files._find_duplicate
+    calls = []
+
+    async def miss_first_lookup(db, project_id, content_sha256):
+        calls.append(content_sha256)
+        if len(calls) == 1:
+            return None
+        return await find_duplicate(db, project_id, content_sha256)
+
+    async def run():
+        project_id = await _create_project()
+        first = await _upload(project_id)
+        uploads = _stored_uploads()
+        monkeypatch.setattr(files, "_find_duplicate", miss_first_lookup)
+        second = await _upload(project_id)
+        return first, second, uploads, await _file_count(project_id)
+
+    first, second, uploads, count = asyncio.run(run())
+
+    # 第二次上传：预查询未命中，提交冲突后重新查询
+    assert len(calls) == 2
+    assert second.id == first.id
+    assert count == 1
+    assert _stored_uploads() == uploads
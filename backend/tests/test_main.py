@@ -0,0 +1,72 @@
+"""应用入口测试：静态文件缓存策略与请求体大小限制"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from main import _HASHED_ASSET, app
+
+
+@pytest.mark.parametrize("filename", [
+    "index-BkZz3a9X.js",
+    "index-3f2a9c1b.js",
+    "vendor-a1b2c3d4.css",
+    "logo-9Fk2LmQa.svg",
+])
+def test_hashed_asset_matches_build_output(filename):
+    assert _HASHED_ASSET.search(filename)
+
+
+@pytest.mark.parametrize("filename", [
+    "my-component-2.js",
+    "chart-v2-final.css",
+    "report_2024.json",
+    "my-datasets.js",
+    "build-20240101.js",
+    "index.html",
+    "favicon.ico",
+])
+def test_hashed_asset_skips_plain_names(filename):
+    assert not _HASHED_ASSET.search(filename)
+
+
+def _post(headers):
+    """直接以ASGI方式调用应用，返回响应状态码与响应头"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/files/upload",
+        "raw_path": b"/api/files/upload",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}
+
+
+def test_oversized_request_rejected_with_cors_headers():
+    origin = settings.ALLOWED_HOSTS[0]
+    status_code, headers = _post({
+        "origin": origin,
+        "content-length": str(settings.MAX_FILE_SIZE + 1),
+    })
+
+    assert status_code == 413
+    # 浏览器能够读取 413 响应，而不是报告跨域错误
+    assert headers["access-control-allow-origin"] == origin
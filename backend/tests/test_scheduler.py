@@ -0,0 +1,118 @@
+"""调度器状态事件批量写入测试"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.scheduler import TaskScheduler
+from app.database import AsyncSessionLocal
+from app.models.task import Task
+
+
+async def _insert_tasks(*task_ids):
+    async with AsyncSessionLocal() as db, db.begin():
+        for task_id in task_ids:
+            db.add(Task(id=task_id, name=task_id, task_type="analysis", status="pending"))
+
+
+async def _load(task_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Task).where(Task.id == task_id))).scalar_one()
+
+
+def test_merge_events_later_values_win_and_first_error_kept():
+    merged = TaskScheduler._merge_events([
+        ("a", {"status": "running", "start_time": 1}),
+        ("b", {"status": "running"}),
+        ("a", {"status": "failed", "error_message": "traceback"}),
+        ("a", {"status": "failed", "error_message": "short"}),
+    ])
+
+    assert merged == {
+        "a": {"status": "failed", "start_time": 1, "error_message": "traceback"},
+        "b": {"status": "running"},
+    }
+
+
+def test_write_events_updates_each_task():
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    end = datetime(2024, 1, 1, 8, 5, 0)
+
+    async def run():
+        await _insert_tasks("a", "b", "c")
+        async with AsyncSessionLocal() as db:
+            await TaskScheduler._write_events(db, [
+                ("a", {"status": "running", "start_time": start}),
+                ("b", {"status": "failed", "error_message": "boom"}),
+                ("a", {"status": "completed", "end_time": end, "result": {"rows": 3}}),
+            ])
+        return await _load("a"), await _load("b"), await _load("c")
+
+    a, b, c = asyncio.run(run())
+
+    assert (a.status, a.start_time, a.end_time, a.result) == ("completed", start, end, {"rows": 3})
+    assert (b.status, b.error_message, b.start_time) == ("failed", "boom", None)
+    # 批次外的任务保持不变
+    assert (c.status, c.error_message) == ("pending", None)
+
+
+def test_write_events_falls_back_to_single_rows():
+    async def run():
+        await _insert_tasks("a", "b")
+        async with AsyncSessionLocal() as db:
+            await TaskScheduler._write_events(db, [
+                ("a", {"status": "completed"}),
+                # 无法序列化的结果使批量更新失败
+                ("b", {"status": "completed", "result": {"value": object()}}),
+            ])
+        return await _load("a"), await _load("b")
+
+    a, b = asyncio.run(run())
+
+    assert a.status == "completed"
+    assert b.status == "pending"
+
+
+def test_shutdown_flushes_queued_events():
+    async def run():
+        await _insert_tasks("a", "b")
+        task_scheduler = TaskScheduler()
+        await task_scheduler.start()
+        assert task_scheduler.queue_task_update("a", {"status": "running"})
+        assert task_scheduler.queue_task_update("a", {"status": "completed"})
+        assert task_scheduler.queue_task_update("b", {"status": "failed"})
+        await task_scheduler.shutdown()
+        # 写入协程停止后由调用方直接写库
+        assert not task_scheduler.queue_task_update("a", {"status": "failed"})
+        return await _load("a"), await _load("b")
+
+    a, b = asyncio.run(run())
+
+    assert (a.status, b.status) == ("completed", "failed")
+
+
+def test_wrap_writes_directly_without_writer(monkeypatch):
+    """写入协程未运行（已停止或异常退出）时作业状态直接写库，不会丢失"""
+    monkeypatch.setattr(settings, "TASK_RUNNING_REPORT_DELAY", 0)
+
+    async def slow_job():
+        await asyncio.sleep(0.05)
+
+    async def failing_job():
+        raise RuntimeError("boom")
+
+    async def run():
+        await _insert_tasks("a", "b")
+        task_scheduler = TaskScheduler()
+        await task_scheduler._wrap("a", slow_job, (), {})
+        await task_scheduler._wrap("b", failing_job, (), {})
+        return await _load("a"), await _load("b")
+
+    a, b = asyncio.run(run())
+
+    # running 上报先于最终状态写入，不会覆盖 completed
+    assert a.status == "completed"
+    assert a.start_time is not None and a.end_time is not None
+    assert (b.status, b.error_message) == ("failed", "boom")
@@ -0,0 +1,116 @@
+"""存储层测试：IndexStorage 增量索引与 JSON 原子写入"""
+
+import asyncio
+import os
+
+from app.core.storage import WORKFLOW_SUFFIX, IndexStorage, JSONStorage, WorkflowStorage
+
+
+def _rebuild_from(entries):
+    """返回记录调用次数的全量重建函数"""
+    calls = []
+
+    def rebuild():
+        calls.append(True)
+        return list(entries)
+
+    return rebuild, calls
+
+
+def test_upsert_entry_rebuilds_missing_index(tmp_path):
+    index_file = str(tmp_path / "index.json")
+    rebuild, calls = _rebuild_from([{"id": "a", "updated_at": "1"}])
+
+    entries = IndexStorage.upsert_entry(
+        index_file, "items", {"id": "a", "updated_at": "1"}, "updated_at", rebuild
+    )
+
+    assert calls == [True]
+    assert entries == [{"id": "a", "updated_at": "1"}]
+
+
+def test_upsert_entry_inserts_and_replaces_sorted(tmp_path):
+    index_file = str(tmp_path / "index.json")
+    IndexStorage.save_entries(index_file, "items", [
+        {"id": "a", "updated_at": "2"},
+        {"id": "b", "updated_at": "1"},
+    ])
+    rebuild, calls = _rebuild_from([])
+
+    IndexStorage.upsert_entry(
+        index_file, "items", {"id": "c", "updated_at": "3"}, "updated_at", rebuild
+    )
+    entries = IndexStorage.upsert_entry(
+        index_file, "items", {"id": "b", "updated_at": "4"}, "updated_at", rebuild
+    )
+
+    assert calls == []
+    assert [e["id"] for e in entries] == ["b", "c", "a"]
+    assert IndexStorage.load_entries(index_file, "items") == entries
+
+
+def test_remove_entry(tmp_path):
+    index_file = str(tmp_path / "index.json")
+    IndexStorage.save_entries(index_file, "items", [
+        {"id": "a", "updated_at": "2"},
+        {"id": "b", "updated_at": "1"},
+    ])
+    rebuild, calls = _rebuild_from([])
+
+    entries = IndexStorage.remove_entry(index_file, "items", "a", rebuild)
+    assert entries == [{"id": "b", "updated_at": "1"}]
+
+    # 不存在的条目不影响索引
+    entries = IndexStorage.remove_entry(index_file, "items", "missing", rebuild)
+    assert entries == [{"id": "b", "updated_at": "1"}]
+    assert calls == []
+    assert IndexStorage.load_entries(index_file, "items") == entries
+
+
+def test_remove_entry_rebuilds_missing_index(tmp_path):
+    index_file = str(tmp_path / "index.json")
+    rebuild, calls = _rebuild_from([{"id": "b", "updated_at": "1"}])
+
+    entries = IndexStorage.remove_entry(index_file, "items", "a", rebuild)
+
+    assert calls == [True]
+    assert entries == [{"id": "b", "updated_at": "1"}]
+
+
+def test_asave_json_replaces_atomically(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "cache" / "result.json")
+
+    assert asyncio.run(JSONStorage.asave_json(cache_file, {"rows": 1}))
+    assert JSONStorage.load_json(cache_file) == {"rows": 1}
+
+    # 替换失败时原文件保持完整，临时文件被清理
+    def fail_replace(src, dst):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(os, "replace", fail_replace)
+    assert not asyncio.run(JSONStorage.asave_json(cache_file, {"rows": 2}))
+    assert JSONStorage.load_json(cache_file) == {"rows": 1}
+    assert os.listdir(tmp_path / "cache") == ["result.json"]
+
+
+def test_read_file_cached_invalidates_on_change(tmp_path):
+    workflow_file = str(tmp_path / f"wf{WORKFLOW_SUFFIX}")
+    JSONStorage.save_msgpack(workflow_file, {"version": 1})
+
+    first = WorkflowStorage.read_file_cached(workflow_file)
+    assert first == {"version": 1}
+    assert WorkflowStorage.read_file_cached(workflow_file) is first
+
+    JSONStorage.save_msgpack(workflow_file, {"version": 2})
+    os.utime(workflow_file, ns=(1, 1))
+    assert WorkflowStorage.read_file_cached(workflow_file) == {"version": 2}
+
+    # 读取失败不缓存，文件修复后立即可读
+    broken_file = str(tmp_path / "broken.json")
+    with open(broken_file, "wb") as f:
+        f.write(b"{")
+    os.utime(broken_file, ns=(1, 1))
+    assert WorkflowStorage.read_file_cached(broken_file) is None
+    JSONStorage.save_json(broken_file, {"ok": True})
+    os.utime(broken_file, ns=(1, 1))
+    assert WorkflowStorage.read_file_cached(broken_file) == {"ok": True}
@@ -0,0 +1,126 @@
+"""TaskManager 游标分页测试"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal, _normalize_task_created_at, engine
+from app.models.task import Task
+from app.services.task_manager import TaskManager
+
+BASE_TIME = datetime(2024, 1, 1, 8, 0, 0)
+
+
+async def _insert_tasks():
+    """插入7个任务，其中 t3/t4 创建时间相同"""
+    offsets = {"t0": 0, "t1": 1, "t2": 2, "t3": 3, "t4": 3, "t5": 4, "t6": 5}
+    async with AsyncSessionLocal() as db, db.begin():
+        for task_id, minutes in offsets.items():
+            db.add(Task(
+                id=task_id,
+                name=task_id,
+                task_type="analysis",
+                status="completed" if task_id in ("t1", "t4") else "pending",
+                created_at=BASE_TIME + timedelta(minutes=minutes),
+            ))
+
+
+async def _collect_pages(limit, use_id=True, **filters):
+    """按游标逐页读取全部任务，返回每页的任务ID"""
+    pages = []
+    after = after_id = None
+    while True:
+        page = await TaskManager.list_tasks(
+            limit=limit, after=after, after_id=after_id, **filters
+        )
+        if not page:
+            return pages
+        pages.append([task["id"] for task in page])
+        after = page[-1]["created_at"]
+        after_id = page[-1]["id"] if use_id else None
+
+
+def test_list_tasks_cursor_pages_cover_all_rows():
+    async def run():
+        await _insert_tasks()
+        return await _collect_pages(limit=3)
+
+    pages = asyncio.run(run())
+
+    # 按创建时间倒序，创建时间相同的按ID倒序，不重复也不遗漏
+    assert pages == [["t6", "t5", "t4"], ["t3", "t2", "t1"], ["t0"]]
+
+
+def test_list_tasks_cursor_matches_offset_paging():
+    async def run():
+        await _insert_tasks()
+        by_offset = await TaskManager.list_tasks(limit=100)
+        cursor_pages = await _collect_pages(limit=2)
+        return [task["id"] for task in by_offset], cursor_pages
+
+    by_offset, cursor_pages = asyncio.run(run())
+
+    assert [task_id for page in cursor_pages for task_id in page] == by_offset
+
+
+def test_list_tasks_cursor_ignores_offset_and_applies_filters():
+    async def run():
+        await _insert_tasks()
+        page = await TaskManager.list_tasks(
+            limit=10, offset=5, after=BASE_TIME + timedelta(minutes=4)
+        )
+        completed = await _collect_pages(limit=1, status="completed")
+        return [task["id"] for task in page], completed
+
+    page, completed = asyncio.run(run())
+
+    # 只带时间的游标跳过同一时间的全部任务
+    assert page == ["t4", "t3", "t2", "t1", "t0"]
+    assert completed == [["t4"], ["t1"]]
+
+
+async def _collect_cursor_pages(limit, max_pages=20):
+    """按接口返回的游标格式（ISO字符串解析回 datetime）翻页，超过页数上限视为未前进"""
+    pages = []
+    after = after_id = None
+    for _ in range(max_pages):
+        page = await TaskManager.list_tasks(limit=limit, after=after, after_id=after_id)
+        if not page:
+            return pages
+        pages.append([task["id"] for task in page])
+        after = datetime.fromisoformat(page[-1]["created_at"].isoformat())
+        after_id = page[-1]["id"]
+    raise AssertionError(f"游标分页未结束: {pages[-3:]}")
+
+
+def test_list_tasks_cursor_with_default_created_at():
+    """创建时间使用模型默认值（同一秒内插入）时游标分页能前进并结束"""
+    async def run():
+        async with AsyncSessionLocal() as db, db.begin():
+            for i in range(5):
+                db.add(Task(id=f"t{i}", name=f"t{i}", task_type="analysis"))
+        return await _collect_cursor_pages(limit=2)
+
+    pages = asyncio.run(run())
+
+    assert sorted(task_id for page in pages for task_id in page) == ["t0", "t1", "t2", "t3", "t4"]
+
+
+def test_list_tasks_cursor_with_legacy_whole_second_rows():
+    """旧版本由 CURRENT_TIMESTAMP 写入的整秒创建时间经启动时补齐后可正常翻页"""
+    async def run():
+        async with AsyncSessionLocal() as db, db.begin():
+            for i in range(5):
+                await db.execute(text(
+                    "INSERT INTO tasks (id, name, task_type, status, priority, retry_count, "
+                    "max_retries, created_at, updated_at) VALUES "
+                    "(:id, :id, 'analysis', 'pending', 0, 0, 3, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+                ), {"id": f"t{i}"})
+        async with engine.begin() as conn:
+            await conn.run_sync(_normalize_task_created_at)
+        return await _collect_cursor_pages(limit=2)
+
+    pages = asyncio.run(run())
+
+    assert pages == [["t4", "t3"], ["t2", "t1"], ["t0"]]